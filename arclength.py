@@ -0,0 +1,98 @@
+"""Arc-length tables for Bezier segments: total length, s(t) and its inverse t(s)."""
+import numpy as np
+
+from bezier_eval import as_points, evaluate, hodograph
+
+GL_ORDER = 8
+GL_X, GL_W = np.polynomial.legendre.leggauss(GL_ORDER)
+NEWTON_STEPS = 3
+
+
+def _speed(hodo, ts):
+    ts = np.asarray(ts, dtype=np.float64)
+    v = evaluate(hodo, ts.ravel())
+    return np.hypot(v[:, 0], v[:, 1]).reshape(ts.shape)
+
+
+def _gauss_legendre(hodo, a, b):
+    """Integral of |B'(t)| over each [a[k], b[k]] with one Gauss-Legendre panel."""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    half = 0.5 * (b - a)
+    mid = 0.5 * (a + b)
+    nodes = mid[..., None] + half[..., None] * GL_X
+    return (_speed(hodo, nodes) * GL_W).sum(axis=-1) * half
+
+
+class ArcLengthTable:
+    """Cumulative arc length on a t grid; lookups are a binary search plus a local correction."""
+    def __init__(self, ts, cum, hodo=None, error=0.0):
+        self.ts = ts
+        self.cum = cum
+        self.hodo = hodo
+        self.error = error
+
+    @classmethod
+    def from_polyline(cls, ts, pts):
+        """Chord-length table from curve samples pts taken at parameters ts."""
+        pts = as_points(pts)
+        chords = np.hypot(*np.diff(pts, axis=0).T) if len(pts) > 1 else np.zeros(0)
+        return cls(np.asarray(ts, dtype=np.float64), np.concatenate(([0.0], np.cumsum(chords))))
+
+    @classmethod
+    def from_quadrature(cls, ctrl, tol=1e-3, intervals=16, max_intervals=4096):
+        """Gauss-Legendre table, doubling the panel count until the total changes by at most tol."""
+        hodo = hodograph(ctrl)
+        if len(hodo) == 0:
+            return cls(np.array([0.0, 1.0]), np.zeros(2))
+        edges = np.linspace(0.0, 1.0, intervals + 1)
+        panels = _gauss_legendre(hodo, edges[:-1], edges[1:])
+        while True:
+            fine_edges = np.linspace(0.0, 1.0, 2 * intervals + 1)
+            fine = _gauss_legendre(hodo, fine_edges[:-1], fine_edges[1:])
+            error = abs(fine.sum() - panels.sum())
+            edges, panels, intervals = fine_edges, fine, 2 * intervals
+            if error <= tol or intervals >= max_intervals:
+                break
+        return cls(edges, np.concatenate(([0.0], np.cumsum(panels))), hodo, error)
+
+    @property
+    def total(self):
+        return float(self.cum[-1])
+
+    def _interval(self, t):
+        i = np.searchsorted(self.ts, t, side="right") - 1
+        return np.clip(i, 0, len(self.ts) - 2)
+
+    def length_at(self, t):
+        """Arc length from t = 0 to t."""
+        t = np.clip(np.asarray(t, dtype=np.float64), 0.0, 1.0)
+        i = self._interval(t)
+        if self.hodo is not None:
+            s = self.cum[i] + _gauss_legendre(self.hodo, self.ts[i], t)
+        else:
+            frac = (t - self.ts[i]) / (self.ts[i + 1] - self.ts[i])
+            s = self.cum[i] + frac * (self.cum[i + 1] - self.cum[i])
+        return s if s.ndim else float(s)
+
+    def t_at_length(self, s):
+        """Parameter t at which the arc length from 0 reaches s."""
+        s = np.clip(np.asarray(s, dtype=np.float64), 0.0, self.total)
+        i = np.clip(np.searchsorted(self.cum, s, side="right") - 1, 0, len(self.ts) - 2)
+        t0, t1 = self.ts[i], self.ts[i + 1]
+        ds = self.cum[i + 1] - self.cum[i]
+        frac = np.divide(s - self.cum[i], ds, out=np.zeros_like(s), where=ds > 0)
+        t = t0 + frac * (t1 - t0)
+        if self.hodo is not None:
+            for _ in range(NEWTON_STEPS):
+                f = self.cum[i] + _gauss_legendre(self.hodo, t0, t) - s
+                v = _speed(self.hodo, t)
+                t = np.clip(t - np.divide(f, v, out=np.zeros_like(f), where=v > 1e-12), t0, t1)
+        return t if t.ndim else float(t)
+
+    def t_at_fraction(self, u):
+        """Parameter t reached after the fraction u of the total length."""
+        u = np.asarray(u, dtype=np.float64)
+        if self.total <= 0:
+            return u if u.ndim else float(u)
+        return self.t_at_length(u * self.total)
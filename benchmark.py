@@ -0,0 +1,334 @@
+"""Reproducible benchmarks for the curve math and the offscreen render path.
+
+    python benchmark.py --save baseline.json          # record a baseline
+    python benchmark.py --compare baseline.json       # exit 1 on regressions
+    python benchmark.py --precision                   # speed versus accuracy per precision mode
+    python benchmark.py --precision --compare p.json  # the same, against a --precision baseline
+
+Scenes are synthetic and seeded, so two runs on the same machine measure the
+same work. Rates are the best of several timed repeats; allocations are the
+tracemalloc peak of one call.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from fractions import Fraction
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt6.QtCore import QRect
+from PyQt6.QtGui import QGuiApplication, QImage, QPainter
+
+import main
+import precision
+from arclength import ArcLengthTable
+from operators import cubic_chains
+from segment_model import make_segments
+
+DEGREES = (2, 3, 5, 10, 20, 30)
+SEGMENT_COUNTS = (1, 10, 100, 1000)
+QUICK_DEGREES = (3, 10)
+QUICK_SEGMENT_COUNTS = (1, 100)
+SEED = 20240601
+TARGET_S = 0.05
+REPEATS = 5
+DEFAULT_THRESHOLD = 0.3
+PRECISION_DEGREES = (5, 10, 20, 30, 40, 50, 60)
+# Interior parameters plus ones close to the ends, where t ** i and (1 - t) ** (n - i) underflow
+PRECISION_TS = (0.0, 1e-12, 1e-6, 1e-3, 0.1, 1 / 3, 0.5, 0.7, 1 - 1e-3, 1 - 1e-6, 1.0)
+PRECISION_LENGTH_TOL = 1e-4
+
+# Kept alive for the whole run; painting needs a QGuiApplication
+_qt_app = None
+
+
+def _init_qt():
+    global _qt_app
+    if QGuiApplication.instance() is None:
+        _qt_app = QGuiApplication(["benchmark"])
+
+
+def random_segment(rng, degree, w=main.DEFAULT_CANVAS_WIDTH, h=main.DEFAULT_CANVAS_HEIGHT):
+    return rng.uniform((0, 0), (w, h), size=(degree + 1, 2))
+
+
+def synthetic_scene(degree, count, seed=SEED):
+    rng = np.random.default_rng(seed + 1000 * degree + count)
+    return make_segments([random_segment(rng, degree) for _ in range(count)])
+
+
+def measure(fn, units=1):
+    """Best rate of fn() in units per second, auto-scaling the loop to about TARGET_S."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= TARGET_S or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(TARGET_S / elapsed) + 1))
+    best = elapsed
+    # A single slow call is already a stable measurement
+    for _ in range(REPEATS - 1 if elapsed < 1.0 else 0):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return loops * units / best if best > 0 else float("inf")
+
+
+def peak_alloc_kib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _ready(fn):
+    """Case factory for a function that needs no setup."""
+    return lambda: fn
+
+
+def math_cases(degrees):
+    ts = np.linspace(0.0, 1.0, 17)
+    for degree in degrees:
+        pts = synthetic_scene(degree, 1)[0]
+
+        def per_t(fn, pts=pts):
+            return _ready(lambda: [fn(pts, t) for t in ts])
+
+        yield f"de_casteljau[deg={degree}]", per_t(main.de_casteljau), len(ts), "evals/s"
+        yield f"de_casteljau_levels[deg={degree}]", per_t(main.de_casteljau_levels), len(ts), "evals/s"
+        yield f"derivative[deg={degree}]", per_t(main.derivative), len(ts), "evals/s"
+        yield f"second_derivative[deg={degree}]", per_t(main.second_derivative), len(ts), "evals/s"
+        yield f"curvature_at[deg={degree}]", per_t(main.curvature_at), len(ts), "evals/s"
+        yield f"approximate_length[deg={degree}]", _ready(lambda pts=pts: main.approximate_length(pts)), 1, "evals/s"
+        yield (f"hodograph_control_points[deg={degree}]", _ready(lambda pts=pts: main.hodograph_control_points(pts)),
+               1, "evals/s")
+        yield (f"cubic_chain[deg={degree}]", _ready(lambda pts=pts: cubic_chains([pts.points], main.CUBIC_CHAIN_TOL)),
+               1, "evals/s")
+
+
+def _paint_scene(degree, count):
+    """Frame functions over one synthetic scene, each run once so caches are warm."""
+    state = main.AppState()
+    state.segments = synthetic_scene(degree, count)
+    image = QImage(state.canvas_w, state.canvas_h, QImage.Format.Format_ARGB32_Premultiplied)
+    rect = QRect(0, 0, state.canvas_w, state.canvas_h)
+
+    def frame():
+        state.t = (state.t + 0.013) % 1.0
+        painter = QPainter(image)
+        main.paint_scene(painter, rect, state)
+        painter.end()
+
+    def cold():
+        state.geometry.clear()
+        frame()
+
+    layers = main.SceneLayers()
+
+    def layered():
+        state.t = (state.t + 0.013) % 1.0
+        painter = QPainter(image)
+        layers.paint(painter, rect, state)
+        painter.end()
+
+    frame()
+    layered()
+    return {"warm": frame, "cold": cold, "layered": layered}
+
+
+def paint_cases(degrees, counts):
+    """Paint cases; a scene is built on the first use of one of its cases, so filtered-out ones cost nothing."""
+    for degree in degrees:
+        for count in counts:
+            built = {}
+
+            def case(kind, degree=degree, count=count, built=built):
+                def make():
+                    if not built:
+                        built.update(_paint_scene(degree, count))
+                    return built[kind]
+                return make
+
+            yield f"paint_warm[deg={degree},segs={count}]", case("warm"), 1, "frames/s"
+            yield f"paint_cold[deg={degree},segs={count}]", case("cold"), 1, "frames/s"
+            yield f"paint_layered[deg={degree},segs={count}]", case("layered"), 1, "frames/s"
+
+
+def run(degrees, counts, select=None):
+    """Time every case whose name contains select; cases are (name, make, units, unit) and make() returns the function."""
+    results = {}
+    cases = list(math_cases(degrees)) + list(paint_cases(degrees, counts))
+    for name, make, units, unit in cases:
+        if select and select not in name:
+            continue
+        fn = make()
+        rate = measure(fn, units)
+        results[name] = {"rate": rate, "unit": unit, "alloc_kib": peak_alloc_kib(fn)}
+        print(f"{name:45s} {rate:14.1f} {unit:9s} {results[name]['alloc_kib']:10.1f} KiB", flush=True)
+    return results
+
+
+def exact_derivative(ctrl, t, order):
+    """order-th derivative at t in rational arithmetic, rounded once to floats."""
+    pts = [(Fraction(x), Fraction(y)) for x, y in ctrl.tolist()]
+    n = len(pts) - 1
+    for r in range(order):
+        pts = [((n - r) * (b[0] - a[0]), (n - r) * (b[1] - a[1])) for a, b in zip(pts, pts[1:])]
+    t = Fraction(t)
+    while len(pts) > 1:
+        pts = [((1 - t) * a[0] + t * b[0], (1 - t) * a[1] + t * b[1]) for a, b in zip(pts, pts[1:])]
+    return float(pts[0][0]), float(pts[0][1])
+
+
+def precision_cases(degree):
+    """(name, mode, fn, reference, units) for the current functions and every precision mode.
+
+    fn() returns (values, bounds); bounds is None for the current functions,
+    which report none. reference() computes the exact values on first use.
+    """
+    ctrl = synthetic_scene(degree, 1)[0].points
+    ts = np.array(PRECISION_TS)
+    exact = {}
+
+    def reference(name):
+        def get():
+            if not exact:
+                d1 = np.array([exact_derivative(ctrl, t, 1) for t in ts])
+                d2 = np.array([exact_derivative(ctrl, t, 2) for t in ts])
+                kappa = (d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]) / np.hypot(d1[:, 0], d1[:, 1]) ** 3
+                length = ArcLengthTable.from_quadrature(ctrl, 1e-11, max_intervals=1 << 16).total
+                exact.update(derivative=d1, second_derivative=d2, curvature=kappa, length=length)
+            # The current curvature_at reports the unsigned curvature
+            return np.abs(exact["curvature"]) if name == "abs_curvature" else exact[name]
+        return get
+
+    def per_t(fn):
+        return lambda: (np.array([fn(ctrl, t) for t in ts]), None)
+
+    yield "derivative", "current", per_t(main.derivative), reference("derivative"), len(ts)
+    yield "second_derivative", "current", per_t(main.second_derivative), reference("second_derivative"), len(ts)
+    yield "curvature", "current", per_t(main.curvature_at), reference("abs_curvature"), len(ts)
+    yield "length", "current", (lambda: (main.approximate_length(ctrl), None)), reference("length"), 1
+    for mode in precision.MODES:
+        yield ("derivative", mode, (lambda mode=mode: precision.evaluate_bounded(ctrl, ts, 1, mode)),
+               reference("derivative"), len(ts))
+        yield ("second_derivative", mode, (lambda mode=mode: precision.evaluate_bounded(ctrl, ts, 2, mode)),
+               reference("second_derivative"), len(ts))
+        yield ("curvature", mode, (lambda mode=mode: precision.curvature(ctrl, ts, mode)),
+               reference("curvature"), len(ts))
+        yield ("length", mode, (lambda mode=mode: precision.length(ctrl, PRECISION_LENGTH_TOL, mode)),
+               reference("length"), 1)
+
+
+def precision_report(degrees, select=None):
+    """Rate, worst relative error and worst reported bound of every case whose key contains select.
+
+    Failed bounds are flagged; the fast length bound is a refinement
+    estimate, so exceeding it is shown but does not count as a failure.
+    """
+    results = {}
+    print(f"{'case':32s} {'mode':12s} {'rate':>14s} {'rel. error':>11s} {'rel. bound':>11s}")
+    for degree in degrees:
+        for name, mode, fn, reference, units in precision_cases(degree):
+            key = f"{name}[deg={degree},mode={mode}]"
+            if select and select not in key:
+                continue
+            values, bounds = fn()
+            ref = np.asarray(reference(), dtype=np.float64)
+            err = np.abs(np.asarray(values) - ref)
+            if err.ndim > 1:
+                err = np.hypot(err[..., 0], err[..., 1])
+                ref = np.hypot(ref[..., 0], ref[..., 1])
+            scale = np.maximum(np.abs(ref), np.finfo(np.float64).tiny)
+            rel_err = float(np.max(err / scale))
+            rel_bound = None if bounds is None else float(np.max(np.asarray(bounds) / scale))
+            held = bounds is None or bool(np.all(err <= np.asarray(bounds)))
+            estimate = name == "length" and mode == "fast"
+            rate = measure(fn, units)
+            results[key] = {"rate": rate, "unit": "evals/s", "rel_error": rel_err, "rel_bound": rel_bound,
+                            "bound_held": held or estimate}
+            bound_text = "—" if rel_bound is None else f"{rel_bound:.1e}"
+            flag = "" if held else "  estimate exceeded" if estimate else "  BOUND VIOLATED"
+            print(f"{name + f'[deg={degree}]':32s} {mode:12s} {rate:14.1f} {rel_err:11.1e} {bound_text:>11s}{flag}",
+                  flush=True)
+    return results
+
+
+def environment():
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(baseline, results, threshold, section="results"):
+    """Names whose rate dropped by more than threshold relative to the baseline's section."""
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(section, {}).get(name)
+        if base is None or base["rate"] <= 0:
+            continue
+        change = cur["rate"] / base["rate"] - 1
+        flag = "REGRESSION" if change < -threshold else ""
+        print(f"{name:45s} {change:+8.1%} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", metavar="JSON", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown before a case counts as a regression")
+    parser.add_argument("--quick", action="store_true", help="small grid for smoke runs")
+    parser.add_argument("-k", dest="select", help="only run cases whose name contains this text")
+    parser.add_argument("--precision", action="store_true",
+                        help="compare the precision modes with the current functions instead")
+    args = parser.parse_args(argv)
+
+    if args.precision:
+        section = "precision"
+        results = precision_report(QUICK_DEGREES if args.quick else PRECISION_DEGREES, args.select)
+    else:
+        section = "results"
+        _init_qt()
+        degrees = QUICK_DEGREES if args.quick else DEGREES
+        counts = QUICK_SEGMENT_COUNTS if args.quick else SEGMENT_COUNTS
+        results = run(degrees, counts, args.select)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), section: results}, f, indent=1)
+    status = 0
+    if args.precision and not all(r["bound_held"] for r in results.values()):
+        status = 1
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if section not in baseline:
+            print(f"{args.compare} has no '{section}' section to compare against")
+            return 1
+        regressions = compare(baseline, results, args.threshold, section)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
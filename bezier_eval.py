@@ -0,0 +1,171 @@
+"""Batch evaluation of Bezier segments with NumPy (no Qt imports)."""
+from functools import lru_cache
+
+import numpy as np
+
+
+def as_points(points):
+    """Control points as an (N, 2) float64 array; lists of {"x", "y"} dicts are converted."""
+    if isinstance(points, np.ndarray):
+        return points.reshape(-1, 2).astype(np.float64, copy=False)
+    if len(points) and isinstance(points[0], dict):
+        return np.array([(p["x"], p["y"]) for p in points], dtype=np.float64).reshape(-1, 2)
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def bernstein_basis(n, ts):
+    """Matrix B with B[k, i] = b_{i,n}(ts[k]), built with the stable de Casteljau recurrence."""
+    ts = np.asarray(ts, dtype=np.float64).reshape(-1)
+    s = 1.0 - ts
+    B = np.zeros((ts.size, n + 1))
+    B[:, 0] = 1.0
+    for r in range(1, n + 1):
+        # b_{i,r} = (1-t) b_{i,r-1} + t b_{i-1,r-1}, updated right to left in place
+        B[:, r] = ts * B[:, r - 1]
+        for i in range(r - 1, 0, -1):
+            B[:, i] = s * B[:, i] + ts * B[:, i - 1]
+        B[:, 0] = s * B[:, 0]
+    return B
+
+
+@lru_cache(maxsize=128)
+def uniform_basis(n, steps):
+    """Cached Bernstein matrix of degree n on the grid t = i / steps, i = 0..steps."""
+    B = bernstein_basis(n, np.linspace(0.0, 1.0, steps + 1))
+    B.setflags(write=False)
+    return B
+
+
+def hodograph(ctrl):
+    """Control points of B'(t) as an (N-1, 2) array."""
+    ctrl = as_points(ctrl)
+    n = len(ctrl) - 1
+    if n <= 0:
+        return np.zeros((0, 2))
+    return n * np.diff(ctrl, axis=0)
+
+
+def evaluate(ctrl, ts):
+    """Points B(t) for every t in ts, shape (len(ts), 2), with the vectorised Bernstein-form Horner scheme."""
+    ctrl = as_points(ctrl)
+    ts = np.asarray(ts, dtype=np.float64).reshape(-1)
+    n = len(ctrl) - 1
+    out = np.zeros((ts.size, 2))
+    if n < 0:
+        return out
+    weighted = np.asarray(binomials(n))[:, None] * ctrl
+    low = ts <= 0.5
+    # t <= 0.5: Horner in s = t / (1 - t) from P_n down; t > 0.5: in (1 - t) / t from P_0 up
+    for mask, rows, num, den in ((low, weighted[::-1], ts, 1.0 - ts), (~low, weighted, 1.0 - ts, ts)):
+        if not mask.any():
+            continue
+        s = (num[mask] / den[mask])[:, None]
+        acc = np.broadcast_to(rows[0], (len(s), 2))
+        for row in rows[1:]:
+            acc = acc * s + row
+        out[mask] = acc * (den[mask] ** n)[:, None]
+    return out
+
+
+def sample_uniform(ctrl, steps):
+    """B(i / steps) for i = 0..steps using the cached basis for the segment's degree."""
+    ctrl = as_points(ctrl)
+    if len(ctrl) == 0:
+        return np.zeros((steps + 1, 2))
+    return uniform_basis(len(ctrl) - 1, steps) @ ctrl
+
+
+def evaluate_derivative(ctrl, ts):
+    """Velocities B'(t) for every t in ts, evaluated on the hodograph."""
+    h = hodograph(ctrl)
+    ts = np.asarray(ts, dtype=np.float64).reshape(-1)
+    if len(h) == 0:
+        return np.zeros((ts.size, 2))
+    return evaluate(h, ts)
+
+
+# Scalar evaluation with cached coefficient tables.
+#
+# A single point or derivative at one t is evaluated in O(n) with Horner's
+# scheme instead of an O(n^2) de Casteljau pass. Low degrees use the power
+# basis; higher degrees use the Bernstein form of Horner (Schumaker-Volk),
+# which only ever multiplies by ratios in [0, 1] and so stays accurate at
+# degree 50 and beyond.
+
+COEFF_CACHE_SIZE = 64
+POWER_BASIS_MAX_DEGREE = 5
+
+
+@lru_cache(maxsize=COEFF_CACHE_SIZE)
+def binomials(n):
+    """Exact binomial row C(n, 0..n) as floats."""
+    row = [1]
+    for k in range(1, n + 1):
+        row.append(row[-1] * (n + 1 - k) // k)
+    return tuple(float(c) for c in row)
+
+
+@lru_cache(maxsize=COEFF_CACHE_SIZE)
+def difference_matrix(n, order):
+    """Matrix mapping the n + 1 control points to those of the order-th derivative (degree n - order)."""
+    D = np.eye(n + 1)
+    for r in range(order):
+        m = n - r
+        D = m * (D[1:] - D[:-1])
+    D.setflags(write=False)
+    return D
+
+
+@lru_cache(maxsize=COEFF_CACHE_SIZE)
+def power_basis_matrix(n):
+    """Matrix M with B(t) = sum_j (M @ P)[j] t^j, i.e. M[j, i] = C(n, j) C(j, i) (-1)^(j - i)."""
+    cn = binomials(n)
+    M = np.zeros((n + 1, n + 1))
+    for j in range(n + 1):
+        cj = binomials(j)
+        for i in range(j + 1):
+            M[j, i] = cn[j] * cj[i] * (-1) ** (j - i)
+    M.setflags(write=False)
+    return M
+
+
+def horner_point(ctrl, t):
+    """B(t) for one t as an (x, y) array, in O(n)."""
+    ctrl = as_points(ctrl)
+    n = len(ctrl) - 1
+    if n < 0:
+        return np.zeros(2)
+    if n <= POWER_BASIS_MAX_DEGREE:
+        coeffs = (power_basis_matrix(n) @ ctrl).tolist()
+        x, y = coeffs[n]
+        for cx, cy in reversed(coeffs[:n]):
+            x = x * t + cx
+            y = y * t + cy
+        return np.array([x, y])
+    pts = ctrl.tolist()
+    c = binomials(n)
+    u = 1.0 - t
+    if t <= 0.5:
+        s = t / u
+        x, y = pts[n]
+        for i in range(n - 1, -1, -1):
+            x = x * s + c[i] * pts[i][0]
+            y = y * s + c[i] * pts[i][1]
+        scale = u ** n
+    else:
+        s = u / t
+        x, y = pts[0]
+        for i in range(1, n + 1):
+            x = x * s + c[i] * pts[i][0]
+            y = y * s + c[i] * pts[i][1]
+        scale = t ** n
+    return np.array([x * scale, y * scale])
+
+
+def horner_derivative(ctrl, t, order=1):
+    """order-th derivative of B at one t, from the cached difference matrix and horner_point."""
+    ctrl = as_points(ctrl)
+    n = len(ctrl) - 1
+    if n < order:
+        return np.zeros(2)
+    return horner_point(difference_matrix(n, order) @ ctrl, t)
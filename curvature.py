@@ -0,0 +1,97 @@
+"""Batched curvature analysis: comb samples, curvature extrema and inflection points."""
+import numpy as np
+
+from bezier_eval import as_points, difference_matrix, evaluate
+
+COMB_SAMPLES = 96
+ROOT_SAMPLES_PER_DEGREE = 8
+ROOT_ITERATIONS = 30
+SPEED_EPS = 1e-9
+
+
+def find_roots(f, samples):
+    """Sign changes of f on an even grid of [0, 1], refined together with the Illinois method."""
+    ts = np.linspace(0.0, 1.0, samples)
+    ys = f(ts)
+    exact = ts[ys == 0]
+    brackets = np.nonzero(ys[:-1] * ys[1:] < 0)[0]
+    a, b = ts[brackets], ts[brackets + 1]
+    fa, fb = ys[brackets], ys[brackets + 1]
+    side = np.zeros(len(a), dtype=int)
+    for _ in range(ROOT_ITERATIONS):
+        if len(a) == 0:
+            break
+        c = (a * fb - b * fa) / (fb - fa)
+        fc = f(c)
+        left = fa * fc < 0
+        # Keep the bracket and halve the value at an end that was kept twice (Illinois)
+        b = np.where(left, c, b)
+        a = np.where(left, a, c)
+        fa_new = np.where(left, np.where(side == -1, fa / 2, fa), fc)
+        fb_new = np.where(left, fc, np.where(side == 1, fb / 2, fb))
+        fa, fb = fa_new, fb_new
+        side = np.where(left, -1, 1)
+        done = fc == 0
+        if done.any():
+            exact = np.concatenate((exact, c[done]))
+            keep = ~done
+            a, b, fa, fb, side = a[keep], b[keep], fa[keep], fb[keep], side[keep]
+    roots = np.concatenate((exact, (a * fb - b * fa) / (fb - fa) if len(a) else np.zeros(0)))
+    return np.unique(np.clip(roots, 0.0, 1.0))
+
+
+class CurvatureAnalysis:
+    """Signed curvature along one segment, its extrema and inflections, from one pass over the hodographs."""
+    def __init__(self, ctrl, samples=COMB_SAMPLES):
+        ctrl = as_points(ctrl)
+        n = len(ctrl) - 1
+        self.degree = n
+        self.d1 = difference_matrix(n, 1) @ ctrl if n >= 1 else np.zeros((1, 2))
+        self.d2 = difference_matrix(n, 2) @ ctrl if n >= 2 else np.zeros((1, 2))
+        self.d3 = difference_matrix(n, 3) @ ctrl if n >= 3 else np.zeros((1, 2))
+        self.ts = np.linspace(0.0, 1.0, samples)
+        self.points = evaluate(ctrl, self.ts)
+        self.curvature, self.normals = self.curvature_at(self.ts, with_normals=True)
+        root_samples = max(64, ROOT_SAMPLES_PER_DEGREE * 2 * max(n, 1))
+        self.inflections = find_roots(self._cross, root_samples) if n >= 2 else np.zeros(0)
+        self.extrema = find_roots(self._curvature_slope, root_samples) if n >= 2 else np.zeros(0)
+        candidates = np.concatenate(([0.0, 1.0], self.extrema, self.ts))
+        k = np.abs(self.curvature_at(candidates))
+        i = int(np.argmax(k)) if len(k) else 0
+        self.max_curvature = float(k[i]) if len(k) else 0.0
+        self.max_t = float(candidates[i]) if len(k) else 0.0
+
+    def curvature_at(self, ts, with_normals=False):
+        """Signed curvature at ts; 0 where the speed vanishes. Optionally unit left normals too."""
+        ts = np.asarray(ts, dtype=np.float64)
+        v = evaluate(self.d1, ts)
+        a = evaluate(self.d2, ts)
+        speed = np.hypot(v[:, 0], v[:, 1])
+        cross = v[:, 0] * a[:, 1] - v[:, 1] * a[:, 0]
+        ok = speed > SPEED_EPS
+        k = np.divide(cross, speed ** 3, out=np.zeros_like(cross), where=ok)
+        if not with_normals:
+            return k
+        normals = np.zeros_like(v)
+        normals[ok] = np.column_stack((-v[ok, 1], v[ok, 0])) / speed[ok, None]
+        return k, normals
+
+    def _cross(self, ts):
+        v = evaluate(self.d1, ts)
+        a = evaluate(self.d2, ts)
+        return v[:, 0] * a[:, 1] - v[:, 1] * a[:, 0]
+
+    def _curvature_slope(self, ts):
+        """Numerator of d|k|/dt up to a positive factor: C' |v|^2 - 3 C (v . a), with C = v x a."""
+        v = evaluate(self.d1, ts)
+        a = evaluate(self.d2, ts)
+        j = evaluate(self.d3, ts)
+        cross = v[:, 0] * a[:, 1] - v[:, 1] * a[:, 0]
+        dcross = v[:, 0] * j[:, 1] - v[:, 1] * j[:, 0]
+        return dcross * (v * v).sum(axis=1) - 3 * cross * (v * a).sum(axis=1)
+
+    def comb(self, length):
+        """Tooth tips of a curvature comb whose longest tooth is length units, drawn on the convex side."""
+        peak = np.abs(self.curvature).max() if len(self.curvature) else 0.0
+        scale = length / peak if peak > 0 else 0.0
+        return self.points - self.normals * (self.curvature * scale)[:, None]
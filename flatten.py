@@ -0,0 +1,70 @@
+"""Adaptive flattening of Bezier segments by recursive de Casteljau subdivision."""
+import numpy as np
+
+from bezier_eval import as_points
+
+DEFAULT_TOLERANCE = 0.25
+MAX_DEPTH = 16
+
+
+def split_batch(ctrl, t=0.5):
+    """Split K segments of shape (K, n+1, 2) at t; returns the left and right control points."""
+    n = ctrl.shape[1] - 1
+    left = np.empty_like(ctrl)
+    right = np.empty_like(ctrl)
+    left[:, 0] = ctrl[:, 0]
+    right[:, n] = ctrl[:, n]
+    cur = ctrl
+    for r in range(1, n + 1):
+        cur = (1 - t) * cur[:, :-1] + t * cur[:, 1:]
+        left[:, r] = cur[:, 0]
+        right[:, n - r] = cur[:, -1]
+    return left, right
+
+
+def flatness(ctrl):
+    """Largest distance of the inner control points of each segment from its chord.
+
+    By the convex-hull property this bounds how far the curve strays from the chord.
+    """
+    if ctrl.shape[1] <= 2:
+        return np.zeros(len(ctrl))
+    a = ctrl[:, :1]
+    d = ctrl[:, -1:] - a
+    w = ctrl[:, 1:-1] - a
+    dd = (d * d).sum(axis=-1)
+    u = np.divide((w * d).sum(axis=-1), dd, out=np.zeros(w.shape[:2]), where=dd > 1e-24)
+    off = w - np.clip(u, 0.0, 1.0)[..., None] * d
+    return np.hypot(off[..., 0], off[..., 1]).max(axis=1)
+
+
+def flatten(ctrl, tol=DEFAULT_TOLERANCE, max_depth=MAX_DEPTH):
+    """Parameters and points of a polyline within tol of the curve, as (ts, pts).
+
+    All pieces of one subdivision depth are tested and split together, so the
+    cost is a handful of NumPy calls per depth rather than per piece.
+    """
+    ctrl = as_points(ctrl)
+    if len(ctrl) == 0:
+        return np.zeros(0), np.zeros((0, 2))
+    if len(ctrl) == 1:
+        return np.zeros(1), ctrl.copy()
+    pieces = ctrl[None]
+    t0 = np.zeros(1)
+    width = 1.0
+    done_t, done_pts = [], []
+    for depth in range(max_depth + 1):
+        flat = flatness(pieces) <= tol if depth < max_depth else np.ones(len(pieces), dtype=bool)
+        done_t.append(t0[flat] + width)
+        done_pts.append(pieces[flat, -1])
+        pieces, t0 = pieces[~flat], t0[~flat]
+        if len(pieces) == 0:
+            break
+        width *= 0.5
+        left, right = split_batch(pieces)
+        pieces = np.concatenate((left, right))
+        t0 = np.concatenate((t0, t0 + width))
+    ts = np.concatenate(done_t)
+    pts = np.concatenate(done_pts)
+    order = np.argsort(ts, kind="stable")
+    return np.concatenate(([0.0], ts[order])), np.concatenate((ctrl[:1], pts[order]))
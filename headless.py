@@ -0,0 +1,344 @@
+"""Offscreen rendering of scene files to PNG/SVG with the canvas drawing code.
+
+    python main.py render scene.json --frames 120 -o frames/ --jobs 8
+    python main.py record scene.json --frames 1000 --width 1920 -o sweep.y4m
+
+Frames are spread over a pool of worker processes; each worker creates its
+own offscreen QGuiApplication, so no display is needed. record renders a
+t-sweep at a fixed step: every worker draws the static layer once and takes
+blocks of frames whose overlay geometry is evaluated in one batch, and the
+frames are written as PNG files or as one uncompressed video stream.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from pathlib import Path
+
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QRect, QSize
+from PyQt6.QtGui import QGuiApplication, QImage, QPainter
+from PyQt6.QtSvg import QSvgGenerator
+
+from main import (ANIMATION_STEP, FRAME_MS, AppState, apply_view, begin_scene, overlay_batches, overlay_frames,
+                  paint_overlay, paint_scene, paint_static, visible_geometry)
+from flatten import DEFAULT_TOLERANCE
+from scene_io import load_scene
+
+FORMATS = ("png", "svg")
+RECORD_FORMATS = ("png", "y4m", "raw")
+FRAME_BLOCK = 32
+
+_qt_app = None
+_options = None
+_states = {}
+_recorders = {}
+
+
+def _init_worker(options):
+    global _qt_app, _options
+    if QGuiApplication.instance() is None:
+        _qt_app = QGuiApplication(["headless"])
+    _options = options
+
+
+def scene_state(scene_path, options):
+    """AppState holding the scene's segments and the drawing flags from options."""
+    state = AppState()
+    state.segments = load_scene(scene_path)
+    state.show_hodograph = options["hodograph"]
+    state.show_casteljau = options["casteljau"]
+    state.constant_speed = options["constant_speed"]
+    state.flatness_tol = options["tolerance"]
+    return state
+
+
+def frame_rect(state, scale=1.0):
+    """Output rectangle of state's canvas at scale output pixels per canvas unit."""
+    return QRect(0, 0, max(1, int(round(state.canvas_w * scale))), max(1, int(round(state.canvas_h * scale))))
+
+
+def render_frame(state, t, out_path, fmt="png", scale=1.0):
+    """Render state at parameter t to out_path; returns the number of curve samples drawn."""
+    state.t = t
+    rect = frame_rect(state, scale)
+    w, h = rect.width(), rect.height()
+    if fmt == "svg":
+        target = QSvgGenerator()
+        target.setFileName(str(out_path))
+        target.setSize(QSize(w, h))
+        target.setViewBox(rect)
+    else:
+        target = QImage(w, h, QImage.Format.Format_ARGB32_Premultiplied)
+    painter = QPainter(target)
+    samples = paint_scene(painter, rect, state)
+    painter.end()
+    if fmt != "svg" and not target.save(str(out_path)):
+        raise OSError(f"could not write {out_path}")
+    return samples
+
+
+def _render_job(job):
+    scene_path, t, out_path = job
+    state = _states.get(scene_path)
+    if state is None:
+        state = _states[scene_path] = scene_state(scene_path, _options)
+    return render_frame(state, t, out_path, _options["format"], _options["scale"])
+
+
+def build_jobs(scenes, ts, out_dir, fmt):
+    jobs = []
+    for scene in scenes:
+        stem = Path(scene).stem
+        for k, t in enumerate(ts):
+            jobs.append((str(scene), t, str(Path(out_dir) / f"{stem}_{k:05d}.{fmt}")))
+    return jobs
+
+
+def render_jobs(jobs, options, workers=None):
+    """Render (scene, t, out_path) jobs, in-process for one worker, else in a spawn-based pool."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        _init_worker(options)
+        return [_render_job(job) for job in jobs]
+    chunksize = max(1, len(jobs) // (workers * 4))
+    # Forking a process that may already own Qt state is unsafe, so always spawn
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(options,)) as pool:
+        return list(pool.map(_render_job, jobs, chunksize=chunksize))
+
+
+# Recording
+
+class Recorder:
+    """Static layer of a scene rendered once, with the overlay drawn over a copy for each frame."""
+    def __init__(self, state, scale=1.0):
+        self.state = state
+        self.rect = frame_rect(state, scale)
+        self.static = QImage(self.rect.width(), self.rect.height(), QImage.Format.Format_RGB32)
+        painter = QPainter(self.static)
+        visible = []
+        if begin_scene(painter, self.rect, state):
+            visible = visible_geometry(state)
+            paint_static(painter, state, visible)
+        painter.end()
+        self.batches = overlay_batches(visible)
+
+    def overlays(self, ts):
+        """overlay_frames of the scene for all of ts at once."""
+        return overlay_frames(self.batches, ts, self.state.constant_speed, self.state.show_casteljau)
+
+    def frame(self, overlays, f):
+        """Image of frame f of overlays."""
+        image = self.static.copy()
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        if apply_view(painter, self.rect, self.state):
+            paint_overlay(painter, overlays, f)
+        painter.end()
+        return image
+
+
+def sweep_ts(frames):
+    """frames parameter values evenly spaced over [0, 1], both ends included."""
+    return np.arange(frames) / max(1, frames - 1)
+
+
+def animation_frames(speed=1.0):
+    """Frame count of one sweep in the window's animation at speed, which advances t by ANIMATION_STEP * speed per frame."""
+    return int(round(1 / (ANIMATION_STEP * speed))) + 1
+
+
+def rgb_pixels(image):
+    """(h, w, 3) uint8 view of the RGB channels of a Format_RGB32 image."""
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, np.uint8).reshape(image.height(), image.bytesPerLine() // 4, 4)
+    # RGB32 pixels are 0xffRRGGBB words, stored B, G, R, A in little-endian memory
+    return rows[:, :image.width(), 2::-1]
+
+
+def y4m_header(width, height, fps):
+    fps = Fraction(fps).limit_denominator(1001)
+    return f"YUV4MPEG2 W{width} H{height} F{fps.numerator}:{fps.denominator} Ip A1:1 C444\n".encode()
+
+
+def ycbcr_planes(rgb):
+    """Y, Cb and Cr planes (3, h, w) of full-range RGB in limited-range BT.601, the default of Y4M readers.
+
+    8-bit fixed point in uint16: intermediate sums may wrap, but every result
+    lands back in range, so the wraps cancel.
+    """
+    r, g, b = (rgb[..., i].astype(np.uint16) for i in range(3))
+    planes = np.empty((3,) + rgb.shape[:2], np.uint8)
+    planes[0] = (66 * r + 129 * g + 25 * b + (16 << 8 | 128)) >> 8
+    planes[1] = (112 * b - 38 * r - 74 * g + (128 << 8 | 128)) >> 8
+    planes[2] = (112 * r - 94 * g - 18 * b + (128 << 8 | 128)) >> 8
+    return planes
+
+
+def encode_frame(image, fmt):
+    """Bytes of one frame of a raw RGB24 or Y4M (4:4:4 Y'CbCr) stream."""
+    rgb = rgb_pixels(image)
+    if fmt == "raw":
+        return rgb.tobytes()
+    return b"FRAME\n" + ycbcr_planes(rgb).tobytes()
+
+
+def _record_job(job):
+    scene_path, ts, first, out = job
+    recorder = _recorders.get(scene_path)
+    if recorder is None:
+        state = scene_state(scene_path, _options)
+        scale = _options["width"] / state.canvas_w if _options["width"] else _options["scale"]
+        recorder = _recorders[scene_path] = Recorder(state, scale)
+    fmt = _options["format"]
+    overlays = recorder.overlays(ts)
+    chunks = []
+    for f in range(len(ts)):
+        image = recorder.frame(overlays, f)
+        if fmt != "png":
+            chunks.append(encode_frame(image, fmt))
+        elif not image.save(str(Path(out) / f"{Path(scene_path).stem}_{first + f:05d}.png")):
+            raise OSError(f"could not write frame {first + f} to {out}")
+    if fmt == "png":
+        return b""
+    header = y4m_header(recorder.rect.width(), recorder.rect.height(), _options["fps"]) if fmt == "y4m" else b""
+    if first == 0:
+        chunks.insert(0, header)
+    if out == "-":
+        return b"".join(chunks)
+    # Frames of a stream all have the same size, so every block knows its place in the file
+    with open(out, "r+b") as dest:
+        dest.seek(len(header) + first * len(chunks[-1]) if first else 0)
+        dest.write(b"".join(chunks))
+    return b""
+
+
+def _ordered_results(fn, jobs, options, workers):
+    """fn over jobs in order, keeping at most two jobs per worker in flight."""
+    if workers == 1 or len(jobs) <= 1:
+        _init_worker(options)
+        yield from map(fn, jobs)
+        return
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(options,)) as pool:
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.submit(fn, job))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def record(scene, ts, options, out, workers=None, block=FRAME_BLOCK):
+    """Render scene at every t of ts; returns the number of frames.
+
+    png writes numbered files into the directory out; y4m and raw (packed
+    RGB24) write one stream to the file out, or to stdout for "-". Blocks of
+    block frames go to the workers; they write files themselves and send
+    stdout data back, which is written in order.
+    """
+    fmt = options["format"]
+    if fmt not in RECORD_FORMATS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {', '.join(RECORD_FORMATS)}")
+    ts = np.asarray(ts, dtype=np.float64)
+    jobs = [(str(scene), ts[a:a + block], a, str(out)) for a in range(0, len(ts), block)]
+    workers = min(workers or os.cpu_count() or 1, max(1, len(jobs)))
+    if fmt == "png":
+        os.makedirs(out, exist_ok=True)
+    elif out != "-":
+        # Workers write their blocks into the file in place
+        open(out, "wb").close()
+    for data in _ordered_results(_record_job, jobs, options, workers):
+        if data:
+            sys.stdout.buffer.write(data)
+    if out == "-":
+        sys.stdout.buffer.flush()
+    return len(ts)
+
+
+def _add_drawing_options(parser):
+    parser.add_argument("--scale", type=float, default=1.0, help="output pixels per canvas unit")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="flatness tolerance in output pixels")
+    parser.add_argument("--no-hodograph", dest="hodograph", action="store_false")
+    parser.add_argument("--no-casteljau", dest="casteljau", action="store_false")
+    parser.add_argument("--constant-speed", action="store_true", help="treat t as an arc-length fraction")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+
+
+def _drawing_options(args):
+    return {
+        "format": args.format,
+        "scale": args.scale,
+        "tolerance": args.tolerance,
+        "hodograph": args.hodograph,
+        "casteljau": args.casteljau,
+        "constant_speed": args.constant_speed,
+    }
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py render", description="Render scene files without a window.")
+    parser.add_argument("scenes", nargs="+", help="scene files to render")
+    parser.add_argument("-o", "--output-dir", default=".", help="directory for the rendered frames")
+    parser.add_argument("-t", "--t", type=float, nargs="+", default=[0.5], help="parameter values to render")
+    parser.add_argument("--frames", type=int, help="render an even sweep of this many t values in [0, 1]")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="png")
+    _add_drawing_options(parser)
+    return parser.parse_args(argv)
+
+
+def parse_record_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py record",
+                                     description="Record the t-sweep of a scene as PNG frames or an uncompressed video stream.")
+    parser.add_argument("scene", help="scene file to record")
+    parser.add_argument("-o", "--output", required=True,
+                        help="directory for png, file for y4m/raw, or - to stream to stdout")
+    parser.add_argument("-f", "--format", choices=RECORD_FORMATS, default="y4m")
+    parser.add_argument("--frames", type=int, help="frames in the sweep (default: one sweep of the animation at --speed)")
+    parser.add_argument("--speed", type=float, default=1.0, help="animation speed the default frame count matches")
+    parser.add_argument("--fps", type=float, default=1000 / FRAME_MS, help="frame rate written to the y4m header")
+    parser.add_argument("--width", type=int, help="output width in pixels; overrides --scale, height keeps the aspect")
+    parser.add_argument("--block", type=int, default=FRAME_BLOCK, help="frames per worker job")
+    _add_drawing_options(parser)
+    return parser.parse_args(argv)
+
+
+def record_main(argv=None):
+    args = parse_record_args(argv)
+    if args.frames is not None and args.frames < 1 or args.speed <= 0 or args.block < 1:
+        print("frames, speed and block must be positive", file=sys.stderr)
+        return 2
+    frames = args.frames or animation_frames(args.speed)
+    options = _drawing_options(args)
+    options.update(width=args.width, fps=args.fps)
+    try:
+        record(args.scene, sweep_ts(frames), options, args.output, args.jobs, args.block)
+    except BrokenPipeError:
+        # The reading end closed early (e.g. a player that was quit); not an error
+        sys.stderr.close()
+        return 0
+    print(f"recorded {frames} frame(s) to {args.output}", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.frames:
+        ts = [k / max(1, args.frames - 1) for k in range(args.frames)]
+    else:
+        ts = args.t
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = _drawing_options(args)
+    jobs = build_jobs(args.scenes, ts, args.output_dir, args.format)
+    render_jobs(jobs, options, args.jobs)
+    print(f"rendered {len(jobs)} frame(s) to {args.output_dir}")
+    return 0
@@ -0,0 +1,279 @@
+"""Undo/redo over snapshots of the segment list that share unchanged segments.
+
+A snapshot holds one SegmentState per segment, grouped into chunks of CHUNK
+states. A state's control points are a read-only array, and a segment that did
+not change since it was last recorded reuses its state; a chunk whose
+segments did not change is reused whole. An entry therefore costs one
+reference per chunk plus the chunks and points the edit actually touched.
+Restoring hands back the live Segment objects that are unchanged (so their
+cached geometry stays valid) and wraps the frozen arrays of the others; those
+are copied on their first edit.
+"""
+import time
+from operator import attrgetter
+
+from segment_model import Segment
+
+DEFAULT_BUDGET = 64 * 1024 * 1024
+CHUNK = 64
+COALESCE_S = 1.0
+# Estimated sizes of a reference, a state record and an empty tuple
+REF_BYTES = 8
+STATE_BYTES = 72
+TUPLE_BYTES = 40
+
+_version = attrgetter("version")
+_flags = attrgetter("visible", "locked")
+
+
+class SegmentState:
+    """Frozen control points and display flags of one segment."""
+    __slots__ = ("uid", "points", "visible", "locked")
+
+    def __init__(self, uid, points, visible, locked):
+        self.uid = uid
+        self.points = points
+        self.visible = visible
+        self.locked = locked
+
+
+def freeze(points):
+    """Read-only array of points; already read-only arrays (e.g. memory-mapped scenes) are shared."""
+    if not points.flags.writeable:
+        return points
+    frozen = points.copy()
+    frozen.setflags(write=False)
+    return frozen
+
+
+def _chunk_keys(segments):
+    """Per chunk, the segments with their versions and flags; equal keys mean unchanged chunks."""
+    segs = tuple(segments)
+    versions = tuple(map(_version, segs))
+    flags = tuple(map(_flags, segs))
+    return [(segs[a:a + CHUNK], versions[a:a + CHUNK], flags[a:a + CHUNK]) for a in range(0, len(segs), CHUNK)]
+
+
+class _Entry:
+    __slots__ = ("label", "chunks", "merge", "time")
+
+    def __init__(self, label, chunks, merge):
+        self.label = label
+        self.chunks = chunks
+        self.merge = merge
+        self.time = time.monotonic()
+
+
+class History:
+    """Linear undo/redo history of segment lists, capped by an estimated memory budget.
+
+    commit() records the segments after an edit; committing with the same
+    merge key as the newest entry within COALESCE_S replaces that entry, so a
+    run of small edits becomes one step. The oldest entries are evicted while
+    the estimate exceeds budget.
+    """
+    def __init__(self, segments=(), budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.evicted = 0
+        self.reset(segments)
+
+    def reset(self, segments, label="Start"):
+        """Forget all entries; segments become the only one."""
+        self._entries = []
+        self._index = -1
+        self._refs = {}
+        self._bytes = 0
+        # uid -> (segment, version, state) last recorded or restored for that uid
+        self._known = {}
+        # Chunk keys of the live segments as of the current entry
+        self._view = []
+        chunks, view = self._capture(segments)
+        self._push(_Entry(label, chunks, None), view)
+
+    # Snapshots
+
+    def _state(self, seg):
+        known = self._known.get(seg.uid)
+        if known is not None and known[0] is seg and known[1] == seg.version:
+            state = known[2]
+            if state.visible != seg.visible or state.locked != seg.locked:
+                state = SegmentState(seg.uid, state.points, seg.visible, seg.locked)
+        else:
+            state = SegmentState(seg.uid, freeze(seg.points), seg.visible, seg.locked)
+        self._known[seg.uid] = (seg, seg.version, state)
+        return state
+
+    def _capture(self, segments):
+        view = _chunk_keys(segments)
+        current = self._entries[self._index].chunks if self._entries else ()
+        chunks = []
+        for j, key in enumerate(view):
+            if j < len(self._view) and self._view[j] == key:
+                chunks.append(current[j])
+            else:
+                chunks.append(tuple(map(self._state, key[0])))
+        return tuple(chunks), view
+
+    def _restore(self, entry, current):
+        """Segments for entry; current is the entry the live segments were captured or restored as."""
+        out = []
+        for j, chunk in enumerate(entry.chunks):
+            if j < len(current.chunks) and current.chunks[j] is chunk and j < len(self._view):
+                segs, versions, flags = self._view[j]
+                # Reuse the live run as a whole when none of it was edited since
+                if tuple(map(_version, segs)) == versions and tuple(map(_flags, segs)) == flags:
+                    out.extend(segs)
+                    continue
+            for state in chunk:
+                known = self._known.get(state.uid)
+                if known is not None and known[2].points is state.points and known[0].version == known[1]:
+                    seg = known[0]
+                else:
+                    seg = Segment.wrap(state.points)
+                    seg.uid = state.uid
+                seg.visible = state.visible
+                seg.locked = state.locked
+                self._known[state.uid] = (seg, seg.version, state)
+                out.append(seg)
+        self._view = _chunk_keys(out)
+        return out
+
+    def _prune_known(self, segments):
+        if len(self._known) > 2 * len(segments) + CHUNK:
+            live = {seg.uid for seg in segments}
+            self._known = {uid: v for uid, v in self._known.items() if uid in live}
+
+    # Memory accounting: every distinct chunk, state and points array counts once
+
+    def _acquire(self, obj):
+        ref = self._refs.get(id(obj))
+        if ref is None:
+            self._refs[id(obj)] = [obj, 1]
+            return True
+        ref[1] += 1
+        return False
+
+    def _release(self, obj):
+        ref = self._refs[id(obj)]
+        ref[1] -= 1
+        if ref[1] == 0:
+            del self._refs[id(obj)]
+            return True
+        return False
+
+    def _add_refs(self, entry):
+        self._bytes += TUPLE_BYTES + REF_BYTES * len(entry.chunks)
+        for chunk in entry.chunks:
+            if not self._acquire(chunk):
+                continue
+            self._bytes += TUPLE_BYTES + REF_BYTES * len(chunk)
+            for state in chunk:
+                if self._acquire(state):
+                    self._bytes += STATE_BYTES
+                    if self._acquire(state.points):
+                        self._bytes += state.points.nbytes
+
+    def _drop_refs(self, entry):
+        self._bytes -= TUPLE_BYTES + REF_BYTES * len(entry.chunks)
+        for chunk in entry.chunks:
+            if not self._release(chunk):
+                continue
+            self._bytes -= TUPLE_BYTES + REF_BYTES * len(chunk)
+            for state in chunk:
+                if self._release(state):
+                    self._bytes -= STATE_BYTES
+                    if self._release(state.points):
+                        self._bytes -= state.points.nbytes
+
+    def _push(self, entry, view):
+        for old in self._entries[self._index + 1:]:
+            self._drop_refs(old)
+        del self._entries[self._index + 1:]
+        self._entries.append(entry)
+        self._add_refs(entry)
+        self._index = len(self._entries) - 1
+        self._view = view
+        while self._bytes > self.budget and self._index > 0:
+            self._drop_refs(self._entries.pop(0))
+            self._index -= 1
+            self.evicted += 1
+
+    def detach(self):
+        """Copy recorded points that view someone else's buffer (a memory-mapped scene) into owned arrays.
+
+        Afterwards the history no longer keeps such a mapping, and its file, open.
+        """
+        copies = {}
+        for entry in self._entries:
+            for chunk in entry.chunks:
+                for state in chunk:
+                    points = state.points
+                    if points.flags.owndata:
+                        continue
+                    copy = copies.get(id(points))
+                    if copy is None:
+                        copy = copies[id(points)] = points.copy()
+                        copy.setflags(write=False)
+                        ref = self._refs.pop(id(points), None)
+                        if ref is not None:
+                            self._refs[id(copy)] = [copy, ref[1]]
+                    state.points = copy
+        for seg, _, _ in self._known.values():
+            seg.detach()
+
+    # Public API
+
+    def commit(self, segments, label, merge=None):
+        """Record segments after an edit; returns False when nothing changed since the current entry."""
+        chunks, view = self._capture(segments)
+        self._prune_known(segments)
+        top = self._entries[self._index]
+        if len(chunks) == len(top.chunks) and all(a is b for a, b in zip(chunks, top.chunks)):
+            self._view = view
+            return False
+        if (merge is not None and top.merge == merge and self._index == len(self._entries) - 1
+                and self._index > 0 and time.monotonic() - top.time <= COALESCE_S):
+            self._drop_refs(self._entries.pop())
+            self._index -= 1
+        self._push(_Entry(label, chunks, merge), view)
+        return True
+
+    def undo(self):
+        """Segments of the previous entry, or None at the oldest one."""
+        if not self.can_undo:
+            return None
+        current = self._entries[self._index]
+        self._index -= 1
+        return self._restore(self._entries[self._index], current)
+
+    def redo(self):
+        """Segments of the next entry, or None at the newest one."""
+        if not self.can_redo:
+            return None
+        current = self._entries[self._index]
+        self._index += 1
+        return self._restore(self._entries[self._index], current)
+
+    @property
+    def can_undo(self):
+        return self._index > 0
+
+    @property
+    def can_redo(self):
+        return self._index < len(self._entries) - 1
+
+    @property
+    def undo_label(self):
+        return self._entries[self._index].label if self.can_undo else None
+
+    @property
+    def redo_label(self):
+        return self._entries[self._index + 1].label if self.can_redo else None
+
+    @property
+    def memory(self):
+        """Estimated bytes held by the history."""
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
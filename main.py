@@ -1,116 +1,820 @@
 import math
-import copy
+import sys
+import time
+from operator import attrgetter
+import numpy as np
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QScrollArea, QFrame,
     QVBoxLayout, QHBoxLayout, QLabel, QCheckBox, QSlider, QPushButton,
-    QGroupBox,
+    QGroupBox, QFileDialog, QMessageBox, QTableView, QAbstractItemView, QHeaderView, QSpinBox, QComboBox,
 )
-from PyQt6.QtCore import Qt, QTimer, QPointF
-from PyQt6.QtGui import QPainter, QColor, QPen, QPainterPath, QFont
+from PyQt6.QtCore import Qt, QTimer, QSignalBlocker, QPointF, QRectF, QLineF, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QPen, QPainterPath, QPolygonF, QFont, QPixmap, QKeySequence, QShortcut
+
+from bezier_eval import as_points, evaluate, sample_uniform, hodograph, horner_point, horner_derivative, bernstein_basis
+from flatten import flatten, DEFAULT_TOLERANCE
+from segment_model import Segment, make_segments, translate_segments, without
+from arclength import ArcLengthTable
+from spatial_index import SpatialIndex, nearest_index
+from scene_io import load_scene, save_scene
+from profiling import profiler
+from curvature import CurvatureAnalysis
+from queries import QueryCache, self_intersections
+from precision import MODES as PRECISION_MODES, curvature as bounded_curvature, length as bounded_length
+from operators import split_all, elevate_all, reduce_all, cubic_chains
+from segment_list import SegmentListModel
+from history import History
 
 # Constants
 HIT_R = 10
 PT_R = 5
-STEPS = 200
 EMPTY_START = [[]]
 DEFAULT_CANVAS_WIDTH = 800
 DEFAULT_CANVAS_HEIGHT = 500
 HODO_OFFSET = (80, 80)
 TANGENT_SCALE = 0.15
+LENGTH_TOL = 1e-3
+COMB_LENGTH = 40
+CUBIC_CHAIN_TOL = 0.5
+SPLIT_EPS = 1e-6
+LIST_ROW_HEIGHT = 20
+NEW_SEGMENT_STEP = 12
+# Redraw invalidation flags
+DIRTY_OVERLAY = 1   # t moved: tangent arrows, de Casteljau levels, t label
+DIRTY_GEOMETRY = 2  # segments, view or display options changed: static layer
+DIRTY_READOUT = 4   # lengths, curvature and intersection readout
+DIRTY_ALL = DIRTY_OVERLAY | DIRTY_GEOMETRY | DIRTY_READOUT
+FRAME_MS = 16
+# Animation advance of t per frame at speed 1
+ANIMATION_STEP = 0.002
+READOUT_INTERVAL_MS = 100
+MIN_ZOOM = 0.02
+MAX_ZOOM = 50.0
+WHEEL_ZOOM_STEP = 1.0015
+CULL_MARGIN = 30
+SCENE_FILTER = "Binary scene (*.bzs);;JSON scene (*.json)"
 
 def lerp(a, b, t):
-    return {"x": (1 - t) * a["x"] + t * b["x"], "y": (1 - t) * a["y"] + t * b["y"]}
-
-def dist(p, x, y):
-    return math.hypot(p["x"] - x, p["y"] - y)
-
-def point_to_segment_distance(p, a, b):
-    vx, vy = b["x"] - a["x"], b["y"] - a["y"]
-    wx, wy = p["x"] - a["x"], p["y"] - a["y"]
-    c1 = vx * wx + vy * wy
-    if c1 <= 0:
-        return math.hypot(p["x"] - a["x"], p["y"] - a["y"])
-    c2 = vx * vx + vy * vy
-    if c2 <= c1:
-        return math.hypot(p["x"] - b["x"], p["y"] - b["y"])
-    t = c1 / c2
-    proj = {"x": a["x"] + t * vx, "y": a["y"] + t * vy}
-    return math.hypot(p["x"] - proj["x"], p["y"] - proj["y"])
-
-def binom(n, k):
-    r = 1
-    for i in range(1, k + 1):
-        r = r * (n + 1 - i) / i
-    return r
-
-def bern(n, i, t):
-    return binom(n, i) * (t ** i) * ((1 - t) ** (n - i))
+    return (1 - t) * np.asarray(a) + t * np.asarray(b)
 
 def de_casteljau(points, t):
-    tmp = [{"x": p["x"], "y": p["y"]} for p in points]
-    n = len(points)
-    for r in range(1, n):
-        for i in range(n - r):
-            tmp[i] = lerp(tmp[i], tmp[i + 1], t)
-    return tmp[0]
+    return horner_point(points, t)
 
 def de_casteljau_levels(points, t):
-    levels = []
-    cur = [{"x": p["x"], "y": p["y"]} for p in points]
-    levels.append(cur)
-    for r in range(1, len(points)):
-        next_row = [lerp(cur[i], cur[i + 1], t) for i in range(len(cur) - 1)]
-        levels.append(next_row)
-        cur = next_row
+    cur = as_points(points)
+    levels = [cur]
+    for r in range(1, len(cur)):
+        cur = lerp(cur[:-1], cur[1:], t)
+        levels.append(cur)
     return levels
 
 def hodograph_control_points(points):
-    n = len(points) - 1
-    if n <= 0:
-        return []
-    return [
-        {"x": n * (points[i + 1]["x"] - points[i]["x"]),
-         "y": n * (points[i + 1]["y"] - points[i]["y"])}
-        for i in range(n)
-    ]
+    return hodograph(as_points(points))
 
 def derivative(points, t):
-    n = len(points) - 1
-    if n <= 0:
-        return {"x": 0, "y": 0}
-    dx = dy = 0
-    for i in range(n):
-        dx += n * (points[i + 1]["x"] - points[i]["x"]) * bern(n - 1, i, t)
-        dy += n * (points[i + 1]["y"] - points[i]["y"]) * bern(n - 1, i, t)
-    return {"x": dx, "y": dy}
+    return horner_derivative(points, t, 1)
 
 def second_derivative(points, t):
-    n = len(points) - 1
-    if n <= 1:
-        return {"x": 0, "y": 0}
-    dx = dy = 0
-    for i in range(n - 1):
-        dx += n * (n - 1) * (points[i + 2]["x"] - 2 * points[i + 1]["x"] + points[i]["x"]) * bern(n - 2, i, t)
-        dy += n * (n - 1) * (points[i + 2]["y"] - 2 * points[i + 1]["y"] + points[i]["y"]) * bern(n - 2, i, t)
-    return {"x": dx, "y": dy}
+    return horner_derivative(points, t, 2)
 
 def curvature_at(points, t):
-    d = derivative(points, t)
-    dd = second_derivative(points, t)
-    v = math.hypot(d["x"], d["y"])
+    ctrl = as_points(points)
+    d = horner_derivative(ctrl, t, 1)
+    dd = horner_derivative(ctrl, t, 2)
+    v = math.hypot(d[0], d[1])
     if v < 1e-9:
         return 0
-    return abs(d["x"] * dd["y"] - d["y"] * dd["x"]) / (v ** 3)
+    return abs(d[0] * dd[1] - d[1] * dd[0]) / (v ** 3)
 
 def approximate_length(seg, steps=200):
-    L = 0
-    prev = de_casteljau(seg, 0)
-    for i in range(1, steps + 1):
-        tt = i / steps
-        p = de_casteljau(seg, tt)
-        L += math.hypot(p["x"] - prev["x"], p["y"] - prev["y"])
-        prev = p
-    return L
+    pts = sample_uniform(as_points(seg), steps)
+    return float(np.hypot(*np.diff(pts, axis=0).T).sum())
+
+
+def polyline_path(pts):
+    path = QPainterPath()
+    if len(pts) == 0:
+        return path
+    path.addPolygon(QPolygonF([QPointF(x, y) for x, y in pts.tolist()]))
+    return path
+
+
+class SegmentAnalysis:
+    """Measures of one segment version that do not depend on the flatness tolerance.
+
+    Arc length is always built; curvature and self-crossings on request or on
+    first use. base is an earlier analysis of the same version whose parts are reused.
+    length and length_error come from the arc-length table in precision mode
+    fast and from precision.length otherwise; the table still maps arc length to t.
+    """
+    __slots__ = ("segment", "version", "ctrl", "precision", "arclength", "length", "length_error",
+                 "_curvature", "_crossings")
+
+    def __init__(self, seg, version, ctrl, curvature=False, crossings=False, base=None, precision="fast"):
+        self.segment = seg
+        self.version = version
+        self.ctrl = ctrl
+        self.precision = precision
+        if base is None:
+            with profiler.span("length"):
+                self.arclength = ArcLengthTable.from_quadrature(ctrl, LENGTH_TOL)
+            self._curvature = self._crossings = None
+        else:
+            self.arclength = base.arclength
+            self._curvature, self._crossings = base._curvature, base._crossings
+        if base is not None and base.precision == precision:
+            self.length, self.length_error = base.length, base.length_error
+        elif precision == "fast":
+            self.length, self.length_error = self.arclength.total, float(self.arclength.error)
+        else:
+            with profiler.span("length"):
+                self.length, self.length_error = bounded_length(ctrl, LENGTH_TOL, precision)
+        if curvature and self._curvature is None:
+            with profiler.span("curvature"):
+                self._curvature = CurvatureAnalysis(ctrl)
+        if crossings and self._crossings is None:
+            with profiler.span("self-intersections"):
+                self._crossings = self_intersections(ctrl)
+
+    def has(self, curvature=False, crossings=False):
+        """Whether the requested optional parts are built."""
+        return (not curvature or self._curvature is not None) and (not crossings or self._crossings is not None)
+
+    @property
+    def built(self):
+        """(curvature, crossings) flags of the optional parts that are built."""
+        return self._curvature is not None, self._crossings is not None
+
+    @property
+    def curvature(self):
+        """CurvatureAnalysis of the segment, computed on first use."""
+        if self._curvature is None:
+            with profiler.span("curvature"):
+                self._curvature = CurvatureAnalysis(self.ctrl)
+        return self._curvature
+
+    @property
+    def crossings(self):
+        """Self-crossings as (t1, t2, points), computed on first use."""
+        if self._crossings is None:
+            with profiler.span("self-intersections"):
+                self._crossings = self_intersections(self.ctrl)
+        return self._crossings
+
+    def param(self, t, constant_speed=False):
+        """Curve parameter for the shared slider value; with constant_speed, t is an arc-length fraction."""
+        return self.arclength.t_at_fraction(t) if constant_speed else t
+
+
+class SegmentGeometry:
+    """t-independent geometry of one segment, valid while the segment version and tolerance match.
+
+    Length and curvature live in a SegmentAnalysis that is handed on to the
+    next geometry of the same version, so tolerance changes only re-flatten.
+    """
+    __slots__ = ("segment", "version", "generation", "tolerance", "ctrl", "hodo_ctrl", "curve", "hodo",
+                 "polygon_path", "points_path", "curve_path", "hodo_path", "analysis", "_comb_path")
+
+    def __init__(self, seg, version, ctrl, tolerance=DEFAULT_TOLERANCE, generation=0, analysis=None,
+                 curvature=False, precision="fast"):
+        # Built from a snapshot (version, ctrl) so it can run off the GUI thread
+        self.segment = seg
+        self.version = version
+        self.generation = generation
+        self.tolerance = tolerance
+        self.ctrl = ctrl
+        self.hodo_ctrl = hodograph(self.ctrl)
+        with profiler.span("curve sampling"):
+            self.curve = flatten(self.ctrl, tolerance)[1]
+        with profiler.span("hodograph sampling"):
+            self.hodo = flatten(self.hodo_ctrl, tolerance)[1] + HODO_OFFSET if len(self.hodo_ctrl) >= 2 else None
+        self.polygon_path = polyline_path(self.ctrl)
+        self.points_path = QPainterPath()
+        for x, y in self.ctrl.tolist():
+            self.points_path.addEllipse(QPointF(x, y), PT_R, PT_R)
+        self.curve_path = polyline_path(self.curve)
+        self.hodo_path = polyline_path(self.hodo) if self.hodo is not None else None
+        if analysis is None or analysis.segment is not seg or analysis.version != version:
+            analysis = SegmentAnalysis(seg, version, ctrl, curvature, precision=precision)
+        elif analysis.precision != precision or curvature and not analysis.has(curvature=True):
+            analysis = SegmentAnalysis(seg, version, ctrl, curvature, base=analysis, precision=precision)
+        self.analysis = analysis
+        self._comb_path = None
+
+    @property
+    def arclength(self):
+        return self.analysis.arclength
+
+    @property
+    def length(self):
+        return self.analysis.length
+
+    @property
+    def curvature(self):
+        return self.analysis.curvature
+
+    @property
+    def comb_path(self):
+        """Curvature comb teeth, envelope and inflection markers; None until the curvature is built."""
+        if self._comb_path is None:
+            if not self.analysis.has(curvature=True):
+                return None
+            ca = self.curvature
+            tips = ca.comb(COMB_LENGTH)
+            path = QPainterPath()
+            for (x0, y0), (x1, y1) in zip(ca.points.tolist(), tips.tolist()):
+                path.moveTo(x0, y0)
+                path.lineTo(x1, y1)
+            path.addPath(polyline_path(tips))
+            for x, y in evaluate(self.ctrl, ca.inflections).tolist():
+                path.addRect(x - 3, y - 3, 6, 6)
+            self._comb_path = path
+        return self._comb_path
+
+    def param(self, t, constant_speed=False):
+        return self.analysis.param(t, constant_speed)
+
+    @property
+    def sample_count(self):
+        return len(self.curve) + (len(self.hodo) if self.hodo is not None else 0)
+
+
+class _GeometrySignals(QObject):
+    ready = pyqtSignal(object)
+    measured = pyqtSignal(object)
+
+
+class _GeometryJob(QRunnable):
+    """Builds one SegmentGeometry from an immutable snapshot on a pool thread."""
+    def __init__(self, seg, version, ctrl, tolerance, generation, signals, analysis=None, curvature=False,
+                 precision="fast"):
+        super().__init__()
+        self.args = (seg, version, ctrl, tolerance, generation, analysis, curvature, precision)
+        self.signals = signals
+
+    def run(self):
+        self.signals.ready.emit(SegmentGeometry(*self.args))
+
+
+class _AnalysisJob(QRunnable):
+    """Builds one SegmentAnalysis from an immutable snapshot on a pool thread.
+
+    curvature and crossings also build those parts; base is an analysis of
+    the same version whose parts are reused.
+    """
+    def __init__(self, seg, version, ctrl, signals, curvature=False, crossings=False, base=None, precision="fast"):
+        super().__init__()
+        self.args = (seg, version, ctrl, curvature, crossings, base, precision)
+        self.signals = signals
+
+    def run(self):
+        self.signals.measured.emit(SegmentAnalysis(*self.args))
+
+
+class GeometryCache:
+    """Per-segment SegmentGeometry keyed by segment identity and rebuilt on version or tolerance change.
+
+    In asynchronous mode stale entries are rebuilt on QThreadPool workers from
+    snapshots; get() meanwhile returns the last completed entry (or None), and
+    results older than the installed entry's generation are dropped. At most
+    one job per segment is in flight; edits made meanwhile resubmit on return.
+    While curvature is set the jobs build each segment's curvature as well;
+    analyses are measured in the precision mode set in precision.
+    """
+    def __init__(self):
+        self._entries = {}
+        self.rebuilds = 0
+        self.tolerance = DEFAULT_TOLERANCE
+        self.asynchronous = False
+        self.generation = 0
+        self.dropped = 0
+        self.on_ready = None
+        self._pending = {}
+        self._resubmit = set()
+        self._signals = None
+        self._pool = None
+        self._bounds = {}
+        self._analyses = {}
+        self._measuring = {}
+        self.measured = 0
+        self.curvature = False
+        self.precision = "fast"
+        # on_measured(seg) runs on the GUI thread when a pool result installs a new analysis of seg
+        self.on_measured = None
+
+    def enable_async(self, on_ready=None, pool=None):
+        """Build geometry on pool threads; on_ready() runs on the GUI thread after each result."""
+        if self._signals is None:
+            self._signals = _GeometrySignals()
+            self._signals.ready.connect(self._on_ready)
+            self._signals.measured.connect(self._on_measured)
+        self._pool = pool or QThreadPool.globalInstance()
+        self.on_ready = on_ready
+        self.asynchronous = True
+
+    def disable_async(self):
+        self.asynchronous = False
+
+    def _is_fresh(self, entry, seg):
+        return (entry is not None and entry.segment is seg and entry.version == seg.version
+                and entry.tolerance == self.tolerance)
+
+    def set_tolerance(self, tolerance):
+        """Flatness tolerance in logical units; stale entries are rebuilt lazily."""
+        self.tolerance = tolerance
+
+    def get(self, seg):
+        """Geometry for seg; in asynchronous mode possibly an older completed entry, or None."""
+        entry = self._entries.get(id(seg))
+        if self._is_fresh(entry, seg):
+            if self.curvature and not entry.analysis.has(curvature=True):
+                # Only the curvature is missing; it is handed on to the entry when built
+                self.analysis(seg, wait=False, curvature=True)
+            return entry
+        if self.asynchronous:
+            self._submit(seg)
+            return entry if entry is not None and entry.segment is seg else None
+        self.generation += 1
+        entry = SegmentGeometry(seg, seg.version, as_points(seg).copy(), self.tolerance, self.generation,
+                                self._base(seg), self.curvature, self.precision)
+        self._entries[id(seg)] = entry
+        self._analyses[id(seg)] = entry.analysis
+        self.rebuilds += 1
+        return entry
+
+    def _fresh_analysis(self, seg):
+        cached = self._analyses.get(id(seg))
+        if (cached is not None and cached.segment is seg and cached.version == seg.version
+                and cached.precision == self.precision):
+            return cached
+        return None
+
+    def analysis(self, seg, wait=True, curvature=False, crossings=False):
+        """SegmentAnalysis of seg's current version, with its curvature and self-crossings built if asked for.
+
+        Unlike get() it does not depend on the tolerance and never flattens,
+        so the readout can cover every segment, culled ones included. A
+        missing analysis is built synchronously, or with wait=False in
+        asynchronous mode on a pool thread while None is returned.
+        """
+        cached = self._fresh_analysis(seg)
+        if cached is not None and cached.has(curvature, crossings):
+            return cached
+        key = id(seg)
+        if self.asynchronous and not wait:
+            if curvature and not crossings and self.curvature and self._pending.get(key) is seg:
+                # The geometry job in flight builds the curvature too
+                return None
+            # A job already in flight may lack some part; the next request after it lands asks again
+            if self._measuring.get(key) is not seg:
+                self._measuring[key] = seg
+                self._pool.start(_AnalysisJob(seg, seg.version, as_points(seg).copy(), self._signals,
+                                              curvature, crossings, self._base(seg), self.precision))
+            return None
+        cached = self._analyses[key] = SegmentAnalysis(seg, seg.version, as_points(seg).copy(),
+                                                       curvature, crossings, self._base(seg), self.precision)
+        self._hand_on(seg, cached)
+        self.measured += 1
+        return cached
+
+    def _base(self, seg):
+        """Analysis of seg's current version in any precision mode, whose table and parts can be reused."""
+        cached = self._analyses.get(id(seg))
+        if cached is not None and cached.segment is seg and cached.version == seg.version:
+            return cached
+        return None
+
+    def _on_measured(self, analysis):
+        seg = analysis.segment
+        key = id(seg)
+        if self._measuring.get(key) is not seg:
+            return
+        del self._measuring[key]
+        fresh = self._fresh_analysis(seg)
+        if fresh is None or analysis.version == fresh.version and not fresh.has(*analysis.built):
+            self._analyses[key] = analysis
+            self._hand_on(seg, analysis)
+            self.measured += 1
+            if self.on_measured is not None:
+                self.on_measured(seg)
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def _hand_on(self, seg, analysis):
+        # The installed geometry of the same version takes the fuller analysis, so its comb is not rebuilt
+        entry = self._entries.get(id(seg))
+        if entry is not None and entry.segment is seg and entry.version == analysis.version:
+            entry.analysis = analysis
+
+    def _submit(self, seg):
+        key = id(seg)
+        if key in self._pending:
+            self._resubmit.add(key)
+            return
+        self.generation += 1
+        self._pending[key] = seg
+        self._pool.start(_GeometryJob(seg, seg.version, as_points(seg).copy(), self.tolerance,
+                                      self.generation, self._signals, self._base(seg), self.curvature,
+                                      self.precision))
+
+    def _on_ready(self, entry):
+        seg = entry.segment
+        key = id(seg)
+        if self._pending.get(key) is not seg:
+            # Segment was removed (or the cache cleared) while the job ran
+            self.dropped += 1
+            return
+        del self._pending[key]
+        current = self._entries.get(key)
+        if current is not None and current.segment is seg and current.generation > entry.generation:
+            self.dropped += 1
+        else:
+            self._entries[key] = entry
+            fresh = self._fresh_analysis(seg)
+            if fresh is not None and fresh.version == entry.version and fresh.has(*entry.analysis.built):
+                # An analysis job landed meanwhile with as much or more
+                entry.analysis = fresh
+            elif entry.version == seg.version:
+                self._analyses[key] = entry.analysis
+                if self.on_measured is not None:
+                    self.on_measured(seg)
+            self.rebuilds += 1
+        if key in self._resubmit:
+            self._resubmit.discard(key)
+            if not self._is_fresh(self._entries.get(key), seg):
+                self._submit(seg)
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def bounds(self, seg):
+        """Bounding boxes (x0, y0, x1, y1) of the control polygon and of the drawn hodograph polygon.
+
+        By the convex-hull property they contain the curve and the hodograph.
+        Cached per segment version and computed synchronously, since culling
+        needs them before any geometry is built.
+        """
+        key = id(seg)
+        cached = self._bounds.get(key)
+        if cached is not None and cached[0] is seg and cached[1] == seg.version:
+            return cached[2], cached[3]
+        pts = seg.points
+        curve_box = (*pts.min(axis=0), *pts.max(axis=0))
+        h = hodograph(pts) + HODO_OFFSET
+        hodo_box = (*h.min(axis=0), *h.max(axis=0)) if len(h) else None
+        self._bounds[key] = (seg, seg.version, curve_box, hodo_box)
+        return curve_box, hodo_box
+
+    def prune(self, segments):
+        live = {id(seg) for seg in segments}
+        for key in [k for k in self._entries if k not in live]:
+            del self._entries[key]
+        for key in [k for k in self._pending if k not in live]:
+            del self._pending[key]
+            self._resubmit.discard(key)
+        for key in [k for k in self._bounds if k not in live]:
+            del self._bounds[key]
+        for key in [k for k in self._analyses if k not in live]:
+            del self._analyses[key]
+        for key in [k for k in self._measuring if k not in live]:
+            del self._measuring[key]
+
+    def clear(self):
+        self._entries.clear()
+        self._bounds.clear()
+        self._analyses.clear()
+        self._measuring.clear()
+        self._pending.clear()
+        self._resubmit.clear()
+
+
+def lod_tolerance(tol_px, px_per_unit):
+    """Flatness tolerance in logical units for a device scale.
+
+    The scale is rounded up to a power of two, so zooming only rebuilds the
+    geometry when it crosses a level and the on-screen error stays within tol_px.
+    """
+    return tol_px / 2.0 ** math.ceil(math.log2(px_per_unit))
+
+
+def editable(seg):
+    """Whether mouse edits may touch seg."""
+    return seg.visible and not seg.locked
+
+
+def _boxes_overlap(box, x0, y0, x1, y1):
+    return box is not None and box[0] <= x1 and box[2] >= x0 and box[1] <= y1 and box[3] >= y0
+
+
+def begin_scene(painter, rect, app, dpr=1.0):
+    """Clear rect and map the painter to scene coordinates; False if there is nothing to draw."""
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+    painter.fillRect(rect, QColor("#ffffff"))
+    return apply_view(painter, rect, app, dpr)
+
+
+def apply_view(painter, rect, app, dpr=1.0):
+    """Canvas scale, zoom and pan; also picks the flatness tolerance for the resulting device scale."""
+    w, h = app.canvas_w, app.canvas_h
+    if w <= 0 or h <= 0:
+        return False
+    sx = rect.width() / w
+    sy = rect.height() / h
+    painter.scale(sx, sy)
+    painter.scale(app.zoom, app.zoom)
+    painter.translate(-app.pan_x, -app.pan_y)
+    # Flatness tolerance is given in device pixels, so zoomed-out scenes get fewer samples
+    app.geometry.set_tolerance(lod_tolerance(app.flatness_tol, min(sx, sy) * app.zoom * dpr))
+    return True
+
+
+def visible_geometry(app):
+    """(segment, geometry) pairs inside the view; segments whose geometry is still pending are skipped.
+
+    Sets app.culled to the number of segments outside the view.
+    """
+    w, h = app.canvas_w, app.canvas_h
+    culled = 0
+    # Visible area in logical units, widened for arrows and markers drawn past the hull
+    margin = CULL_MARGIN / app.zoom
+    vx0, vy0 = app.pan_x - margin, app.pan_y - margin
+    vx1, vy1 = app.pan_x + w / app.zoom + margin, app.pan_y + h / app.zoom + margin
+    show_hodograph = app.show_hodograph
+    # Geometry built from now on carries the curvature the comb needs
+    app.geometry.curvature = app.show_curvature
+    app.geometry.precision = app.precision
+    visible = []
+    for seg in app.segments:
+        if len(seg) < 2 or not seg.visible:
+            continue
+        curve_box, hodo_box = app.geometry.bounds(seg)
+        if not (_boxes_overlap(curve_box, vx0, vy0, vx1, vy1)
+                or show_hodograph and _boxes_overlap(hodo_box, vx0, vy0, vx1, vy1)):
+            culled += 1
+            continue
+        geo = app.geometry.get(seg)
+        if geo is not None:
+            visible.append((seg, geo))
+    app.culled = culled
+    return visible
+
+
+def paint_static(painter, app, visible):
+    """Everything that does not depend on t: polygons, points, curves, hodographs, combs, intersections.
+
+    Returns the number of curve samples drawn.
+    """
+    samples = 0
+    show_hodograph = app.show_hodograph
+    selected = app.selected
+    ox, oy = HODO_OFFSET
+    for seg, geo in visible:
+        samples += geo.sample_count if show_hodograph else len(geo.curve)
+        # Selection halo (light blue) under the curve
+        if seg.uid in selected:
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.setPen(QPen(QColor(0, 150, 255, 90), 8, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin))
+            painter.drawPath(geo.curve_path)
+        # Control polygon (black)
+        painter.setPen(QPen(QColor("black"), 1, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawPath(geo.polygon_path)
+        # Control points (orange outline only)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.setPen(QPen(QColor("orange"), 1.5, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap))
+        painter.drawPath(geo.points_path)
+        # Bezier curve (red) — stroke only
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.setPen(QPen(QColor("red"), 2.5, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin))
+        painter.drawPath(geo.curve_path)
+
+        # Hodograph (blue) — stroke only
+        if show_hodograph and geo.hodo_path is not None:
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.setPen(QPen(QColor(0, 0, 255, 191), 1.75, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin))
+            painter.drawPath(geo.hodo_path)
+            # Hodograph origin — outline only
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.setPen(QPen(QColor(0, 0, 255, 217), 1))
+            painter.drawEllipse(QPointF(ox, oy), 3.5, 3.5)
+            painter.setPen(QPen(QColor("black")))
+            painter.setFont(QFont("Arial", 12))
+            painter.drawText(int(ox + 10), int(oy - 8), "Hodograph (B'(t))")
+
+        # Curvature comb (purple) — cached per segment version
+        if app.show_curvature and len(seg) >= 3:
+            comb = geo.comb_path
+            if comb is not None:
+                painter.setBrush(Qt.BrushStyle.NoBrush)
+                painter.setPen(QPen(QColor(160, 0, 200, 150), 1))
+                painter.drawPath(comb)
+
+    # Crossings between and within the segments in view; self-crossings arrive from the pool
+    if app.show_intersections:
+        with profiler.span("intersections"):
+            crossings = scene_crossings(app, [seg for seg, geo in visible], wait=False)
+        painter.setBrush(QColor(255, 200, 0, 200))
+        painter.setPen(QPen(QColor("black"), 1))
+        for x, y in crossings.tolist():
+            painter.drawEllipse(QPointF(x, y), 4.5, 4.5)
+    return samples
+
+
+def scene_crossings(app, segments, wait=True):
+    """Points (M, 2) of the crossings between and within segments.
+
+    Pairs are cached per pair of segment versions in app.queries; self-crossings
+    come from the segment analyses, so with wait=False in asynchronous mode
+    those still being computed on the pool are left out.
+    """
+    found = [app.queries.pair_intersections(segments)]
+    for seg in segments:
+        if len(seg) >= 4:
+            analysis = app.geometry.analysis(seg, wait=wait, crossings=True)
+            if analysis is not None:
+                found.append(analysis.crossings[2])
+    found = [f for f in found if len(f)]
+    return np.concatenate(found) if found else np.zeros((0, 2))
+
+
+def overlay_batches(visible):
+    """Visible geometry grouped by degree as (geometries, control points (K, n+1, 2), hodographs (K, n, 2))."""
+    groups = {}
+    for seg, geo in visible:
+        groups.setdefault(len(geo.ctrl), []).append(geo)
+    return [(geos, np.stack([g.ctrl for g in geos]), np.stack([g.hodo_ctrl for g in geos]))
+            for geos in groups.values()]
+
+
+def arrow_segments(p, q, head_len=8):
+    """Shaft and the three edges of the outlined heads of arrows from p to q (..., 2), as (..., 4, 4) line coordinates."""
+    a = np.arctan2(q[..., 1] - p[..., 1], q[..., 0] - p[..., 0])[..., None]
+    offsets = np.array([-math.pi / 6, math.pi / 6])
+    heads = q[..., None, :] - head_len * np.stack((np.cos(a + offsets), np.sin(a + offsets)), axis=-1)
+    left, right = heads[..., 0, :], heads[..., 1, :]
+    starts = np.stack((p, q, left, right), axis=-2)
+    ends = np.stack((q, left, right, q), axis=-2)
+    return np.concatenate((starts, ends), axis=-1)
+
+
+def overlay_frames(batches, ts, constant_speed=False, casteljau=True):
+    """The t-dependent geometry of every degree group for all parameter values ts at once.
+
+    Returns one (arrows (F, K, 4, 4), levels) pair per group of overlay_batches:
+    arrows are the tangent arrow lines, levels the de Casteljau levels as
+    (F, K, n + 1 - r, 2) arrays, the last one the moving point (empty without
+    casteljau).
+    """
+    ts = np.asarray(ts, dtype=np.float64).reshape(-1)
+    frames = []
+    for geos, ctrl, hodo in batches:
+        if constant_speed:
+            s = np.stack([np.atleast_1d(geo.arclength.t_at_fraction(ts)) for geo in geos], axis=1)
+        else:
+            s = np.broadcast_to(ts[:, None], (len(ts), len(geos)))
+        n = ctrl.shape[1] - 1
+        shape = s.shape
+        p = np.einsum("fkj,kjd->fkd", bernstein_basis(n, s).reshape(shape + (n + 1,)), ctrl)
+        d = np.einsum("fkj,kjd->fkd", bernstein_basis(n - 1, s).reshape(shape + (n,)), hodo)
+        levels = []
+        if casteljau:
+            with profiler.span("de Casteljau levels"):
+                cur = np.broadcast_to(ctrl, shape + ctrl.shape[1:])
+                s = s[..., None, None]
+                levels.append(cur)
+                for r in range(n):
+                    cur = (1 - s) * cur[:, :, :-1] + s * cur[:, :, 1:]
+                    levels.append(cur)
+        frames.append((arrow_segments(p, p + d * TANGENT_SCALE), levels))
+    return frames
+
+
+def paint_overlay(painter, frames, f=0):
+    """Draw frame f of overlay_frames: tangent arrows, then the de Casteljau levels with one drawLines call per pen."""
+    arrows, level_lines, level_points, finals = [], [], [], []
+    for lines, levels in frames:
+        arrows += [QLineF(*e) for e in lines[f].reshape(-1, 4).tolist()]
+        for cur in levels[:-1]:
+            cur = cur[f]
+            edges = np.concatenate((cur[:, :-1], cur[:, 1:]), axis=2).reshape(-1, 4)
+            level_lines += [QLineF(*e) for e in edges.tolist()]
+            level_points += cur.reshape(-1, 2).tolist()
+        if levels:
+            finals += levels[-1][f, :, 0].tolist()
+    painter.setBrush(Qt.BrushStyle.NoBrush)
+    # Square caps close the head corners and rasterise far faster than round ones
+    painter.setPen(QPen(QColor(0, 160, 80, 242), 2, Qt.PenStyle.SolidLine, Qt.PenCapStyle.SquareCap))
+    painter.drawLines(arrows)
+    if not finals:
+        return
+    painter.setPen(QPen(QColor(0, 0, 0, 64), 1, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap))
+    painter.drawLines(level_lines)
+    painter.setPen(QPen(QColor(0, 0, 0, 140), 1))
+    for x, y in level_points:
+        painter.drawEllipse(QPointF(x, y), 3.5, 3.5)
+    painter.setPen(QPen(QColor(255, 0, 0, 217), 1.5))
+    for x, y in finals:
+        painter.drawEllipse(QPointF(x, y), 5.5, 5.5)
+
+
+def paint_dynamic(painter, app, visible, batches=None):
+    """The parts that move with t: tangent arrows and de Casteljau levels.
+
+    Everything is evaluated per degree group and lines are drawn with one
+    drawLines call per pen.
+    """
+    batches = overlay_batches(visible) if batches is None else batches
+    paint_overlay(painter, overlay_frames(batches, [app.t], app.constant_speed, app.show_casteljau))
+
+
+def paint_scene(painter, rect, app, dpr=1.0):
+    """Draw the whole scene of app into rect in immediate mode; returns the number of curve samples drawn.
+
+    Used by the headless renderer and the benchmarks; the canvas goes through SceneLayers.
+    """
+    if not begin_scene(painter, rect, app, dpr):
+        return 0
+    visible = visible_geometry(app)
+    samples = paint_static(painter, app, visible)
+    paint_dynamic(painter, app, visible)
+    return samples
+
+
+class SceneLayers:
+    """Retained static layer of the canvas, re-rendered only when its key changes.
+
+    The key covers everything paint_static depends on: widget size, device
+    pixel ratio, view, display options, the segment list with its versions and
+    the geometry cache's rebuild and analysis counts (which also move when
+    background results arrive). Animation frames blit the pixmap and draw
+    only the dynamic overlay.
+    """
+    def __init__(self):
+        self.pixmap = None
+        self.key = None
+        self.visible = []
+        self.batches = []
+        self.samples = 0
+        self.renders = 0
+
+    @staticmethod
+    def scene_key(app, rect, dpr):
+        segments = app.segments
+        return (rect.width(), rect.height(), dpr, app.canvas_w, app.canvas_h, app.zoom, app.pan_x, app.pan_y,
+                app.flatness_tol, app.show_hodograph, app.show_curvature, app.show_intersections,
+                app.display_version, app.geometry.rebuilds, app.geometry.measured, tuple(map(id, segments)), tuple(map(attrgetter("version"), segments)))
+
+    def paint(self, painter, rect, app, dpr=1.0, verify=True):
+        """Blit the static layer (rendering it first if stale), then draw the dynamic overlay.
+
+        With verify=False the caller vouches that nothing static changed and the key is not rebuilt.
+        """
+        if self.pixmap is None or verify and self.key != self.scene_key(app, rect, dpr):
+            with profiler.span("static layer"):
+                self._render(rect, app, dpr)
+        painter.drawPixmap(rect.topLeft(), self.pixmap)
+        with profiler.span("overlay"):
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+            if apply_view(painter, rect, app, dpr):
+                paint_dynamic(painter, app, self.visible, self.batches)
+        return self.samples
+
+    def _render(self, rect, app, dpr):
+        pixmap = QPixmap(max(1, round(rect.width() * dpr)), max(1, round(rect.height() * dpr)))
+        pixmap.setDevicePixelRatio(dpr)
+        painter = QPainter(pixmap)
+        local = QRectF(0, 0, rect.width(), rect.height())
+        if begin_scene(painter, local, app, dpr):
+            self.visible = visible_geometry(app)
+            self.samples = paint_static(painter, app, self.visible)
+        else:
+            self.visible, self.samples = [], 0
+        self.batches = overlay_batches(self.visible)
+        painter.end()
+        self.pixmap = pixmap
+        self.renders += 1
+        # Taken after drawing, since drawing may build geometry
+        self.key = self.scene_key(app, rect, dpr)
+
+
+def draw_profiler_hud(painter, stats):
+    """Frame statistics in the top-right corner, in device coordinates."""
+    lines = [
+        f"{stats['fps']:.1f} fps",
+        f"frame p50 {stats['p50']:.2f} ms  p99 {stats['p99']:.2f} ms",
+        f"samples {stats['samples']}",
+    ]
+    lines += [f"{name} {ms:.3f} ms" for name, ms in sorted(stats["sections"].items())]
+    painter.resetTransform()
+    painter.setFont(QFont("Monospace", 9))
+    metrics = painter.fontMetrics()
+    w = max(metrics.horizontalAdvance(line) for line in lines) + 12
+    h = metrics.height() * len(lines) + 8
+    x = painter.device().width() - w - 6
+    painter.fillRect(x, 6, w, h, QColor(26, 27, 38, 200))
+    painter.setPen(QPen(QColor("#c0caf5")))
+    for i, line in enumerate(lines):
+        painter.drawText(x + 6, 10 + metrics.ascent() + i * metrics.height(), line)
 
 
 class BezierCanvas(QWidget):
@@ -122,6 +826,9 @@ class BezierCanvas(QWidget):
         self.setMouseTracking(True)
         self.setCursor(Qt.CursorShape.OpenHandCursor)
         self._selected_point = None
+        self._pan_anchor = None
+        self.layers = SceneLayers()
+        self._scene_dirty = True
 
     def size_from_state(self):
         w = getattr(self.app, "canvas_w", DEFAULT_CANVAS_WIDTH)
@@ -130,216 +837,235 @@ class BezierCanvas(QWidget):
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
+        self._scene_dirty = True
         self.update()
 
-    def _mouse_to_logical(self, pos):
+    def mark_scene_dirty(self):
+        self._scene_dirty = True
+
+    def _widget_scale(self):
         w, h = self.size_from_state()
         r = self.rect()
         sx = r.width() / w if w else 1
         sy = r.height() / h if h else 1
-        return pos.x() / sx, pos.y() / sy
+        return sx, sy
+
+    def _mouse_to_logical(self, pos):
+        """Widget position to scene coordinates, undoing the canvas scale, zoom and pan."""
+        sx, sy = self._widget_scale()
+        zoom = self.app.zoom
+        return pos.x() / sx / zoom + self.app.pan_x, pos.y() / sy / zoom + self.app.pan_y
+
+    def _hit_radius(self):
+        # HIT_R stays constant on screen whatever the zoom
+        return HIT_R / self.app.zoom
+
+    def wheelEvent(self, event):
+        pos = event.position()
+        x, y = self._mouse_to_logical(pos)
+        zoom = self.app.zoom * WHEEL_ZOOM_STEP ** event.angleDelta().y()
+        zoom = min(MAX_ZOOM, max(MIN_ZOOM, zoom))
+        sx, sy = self._widget_scale()
+        # Keep the scene point under the cursor fixed
+        self.app.zoom = zoom
+        self.app.pan_x = x - pos.x() / sx / zoom
+        self.app.pan_y = y - pos.y() / sy / zoom
+        self.app.redraw()
+        event.accept()
 
     def mousePressEvent(self, event):
         x, y = self._mouse_to_logical(event.position().toPoint())
         if event.button() == Qt.MouseButton.LeftButton and event.modifiers() & Qt.KeyboardModifier.ShiftModifier:
             self._add_control_point(x, y)
+            self.app.commit("Add point")
             self.app.redraw()
             return
         if event.button() == Qt.MouseButton.RightButton:
             self._remove_point(x, y)
+            self.app.commit("Delete point")
             self.app.redraw()
             event.accept()
             return
         if event.button() == Qt.MouseButton.LeftButton:
             self._selected_point = self._find_closest_point(x, y)
-            if self._selected_point:
+            if self._selected_point is not None:
                 self.setCursor(Qt.CursorShape.ClosedHandCursor)
+                return
+        if event.button() in (Qt.MouseButton.LeftButton, Qt.MouseButton.MiddleButton):
+            # Dragging empty canvas (or with the middle button) pans the view
+            self._pan_anchor = (x, y)
+            self.setCursor(Qt.CursorShape.SizeAllCursor)
 
     def mouseMoveEvent(self, event):
         if self._selected_point is not None:
             x, y = self._mouse_to_logical(event.position().toPoint())
-            self._selected_point["x"] = x
-            self._selected_point["y"] = y
+            seg, i = self._selected_point
+            self.app.index.move_point(seg, i, x, y)
+            self.app.redraw()
+        elif self._pan_anchor is not None:
+            x, y = self._mouse_to_logical(event.position().toPoint())
+            self.app.pan_x += self._pan_anchor[0] - x
+            self.app.pan_y += self._pan_anchor[1] - y
             self.app.redraw()
         else:
             super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
+        if event.button() in (Qt.MouseButton.LeftButton, Qt.MouseButton.MiddleButton):
+            if self._selected_point is not None:
+                # The whole drag becomes one undo step; a click without a move records nothing
+                self.app.commit("Move point")
             self._selected_point = None
+            self._pan_anchor = None
             self.setCursor(Qt.CursorShape.OpenHandCursor)
         super().mouseReleaseEvent(event)
 
+    def _hit_index(self):
+        index = self.app.index
+        index.sync(self.app.segments)
+        return index
+
     def _find_closest_point(self, x, y):
-        best = None
-        best_d = float("inf")
-        for seg in self.app.segments:
-            for p in seg:
-                d = dist(p, x, y)
-                if d < best_d:
-                    best_d = d
-                    best = p
-        return best if best_d <= HIT_R else None
+        return self._hit_index().nearest_point(x, y, self._hit_radius(), accept=editable)
 
     def _add_control_point(self, x, y):
-        segments = self.app.segments
-        best_seg = 0
-        best_d = float("inf")
-        p = {"x": x, "y": y}
-        for si, seg in enumerate(segments):
-            for i in range(len(seg) - 1):
-                d = point_to_segment_distance(p, seg[i], seg[i + 1])
-                if d < best_d:
-                    best_d = d
-                    best_seg = si
-            if len(seg) == 1:
-                d = dist(seg[0], x, y)
-                if d < best_d:
-                    best_d = d
-                    best_seg = si
-        seg = segments[best_seg]
+        index = self._hit_index()
+        # A click on a curve inserts between the control points around the hit parameter
+        hit = self.app.queries.closest(self.app.segments, x, y, self._hit_radius(), accept=editable)
+        if hit is not None:
+            seg, t = hit[0], hit[1]
+            n = len(seg) - 1
+            index.insert_point(seg, min(n - 1, int(t * n)) + 1, x, y)
+            return
+        seg = index.nearest_polygon(x, y, accept=editable)
+        if seg is None:
+            seg = next((seg for seg in self.app.segments if editable(seg)), None)
+        if seg is None:
+            seg = Segment()
+            self.app.segments.append(seg)
         if len(seg) == 0:
-            seg.append({"x": x, "y": y})
+            index.insert_point(seg, 0, x, y)
             return
-        idx = min(range(len(seg)), key=lambda i: dist(seg[i], x, y))
-        seg.insert(idx + 1, {"x": x, "y": y})
+        index.insert_point(seg, nearest_index(seg, x, y) + 1, x, y)
 
     def _remove_point(self, x, y):
-        for seg in self.app.segments:
-            if len(seg) <= 2:
-                continue
-            for i, p in enumerate(seg):
-                if dist(p, x, y) < HIT_R:
-                    seg.pop(i)
-                    return
+        index = self._hit_index()
+        hit = index.nearest_point(x, y, self._hit_radius(), accept=lambda seg: len(seg) > 2 and editable(seg))
+        if hit is not None:
+            index.pop_point(*hit)
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
-        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
-        w, h = self.size_from_state()
-        r = self.rect()
-        painter.fillRect(r, QColor("#ffffff"))
-        if w <= 0 or h <= 0:
-            return
-        sx = r.width() / w
-        sy = r.height() / h
-        painter.scale(sx, sy)
-
-        segments = self.app.segments
-        t = self.app.t
-        show_casteljau = self.app.show_casteljau
-        show_hodograph = self.app.show_hodograph
-        ox, oy = HODO_OFFSET
-
-        for seg in segments:
-            if len(seg) < 2:
-                continue
-            # Per-segment point and derivative at t (for tangent vector)
-            p_seg = de_casteljau(seg, t)
-            d_seg = derivative(seg, t)
-            # Control polygon (black)
-            path = QPainterPath()
-            path.moveTo(seg[0]["x"], seg[0]["y"])
-            for p in seg:
-                path.lineTo(p["x"], p["y"])
-            painter.setPen(QPen(QColor("black"), 1, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin))
-            painter.setBrush(Qt.BrushStyle.NoBrush)
-            painter.drawPath(path)
-            # Control points (orange outline only)
-            painter.setBrush(Qt.BrushStyle.NoBrush)
-            painter.setPen(QPen(QColor("orange"), 1.5, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap))
-            for p in seg:
-                painter.drawEllipse(QPointF(p["x"], p["y"]), PT_R, PT_R)
-            # Bezier curve (red) — stroke only
-            painter.setBrush(Qt.BrushStyle.NoBrush)
-            painter.setPen(QPen(QColor("red"), 2.5, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin))
-            prev = de_casteljau(seg, 0)
-            path = QPainterPath()
-            path.moveTo(prev["x"], prev["y"])
-            for i in range(1, STEPS + 1):
-                tt = i / STEPS
-                p = de_casteljau(seg, tt)
-                path.lineTo(p["x"], p["y"])
-            painter.drawPath(path)
-
-            # Tangent vector (green) — for this segment, always when segment has curve
-            to_x = p_seg["x"] + d_seg["x"] * TANGENT_SCALE
-            to_y = p_seg["y"] + d_seg["y"] * TANGENT_SCALE
-            self._draw_arrow(painter, p_seg["x"], p_seg["y"], to_x, to_y, QColor(0, 160, 80, 242))
-
-            # Hodograph (blue) — stroke only
-            if show_hodograph and len(seg) >= 2:
-                h_ctrl = hodograph_control_points(seg)
-                if len(h_ctrl) >= 2:
-                    painter.setBrush(Qt.BrushStyle.NoBrush)
-                    painter.setPen(QPen(QColor(0, 0, 255, 191), 1.75, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin))
-                    hp_prev = de_casteljau(h_ctrl, 0)
-                    path = QPainterPath()
-                    path.moveTo(hp_prev["x"] + ox, hp_prev["y"] + oy)
-                    for i in range(1, STEPS + 1):
-                        tt = i / STEPS
-                        hp = de_casteljau(h_ctrl, tt)
-                        path.lineTo(hp["x"] + ox, hp["y"] + oy)
-                    painter.drawPath(path)
-                    # Hodograph origin — outline only
-                    painter.setBrush(Qt.BrushStyle.NoBrush)
-                    painter.setPen(QPen(QColor(0, 0, 255, 217), 1))
-                    painter.drawEllipse(QPointF(ox, oy), 3.5, 3.5)
-                    painter.setPen(QPen(QColor("black")))
-                    painter.setFont(QFont("Arial", 12))
-                    painter.drawText(int(ox + 10), int(oy - 8), "Hodograph (B'(t))")
-
-            # de Casteljau levels — lines and outline-only points
-            if show_casteljau:
-                levels = de_casteljau_levels(seg, t)
-                painter.setBrush(Qt.BrushStyle.NoBrush)
-                for r in range(len(levels) - 1):
-                    lvl = levels[r]
-                    painter.setPen(QPen(QColor(0, 0, 0, 64), 1, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin))
-                    path = QPainterPath()
-                    path.moveTo(lvl[0]["x"], lvl[0]["y"])
-                    for p in lvl[1:]:
-                        path.lineTo(p["x"], p["y"])
-                    painter.drawPath(path)
-                    painter.setPen(QPen(QColor(0, 0, 0, 140), 1))
-                    for p in lvl:
-                        painter.drawEllipse(QPointF(p["x"], p["y"]), 3.5, 3.5)
-                last = levels[-1][0]
-                painter.setPen(QPen(QColor(255, 0, 0, 217), 1.5))
-                painter.drawEllipse(QPointF(last["x"], last["y"]), 5.5, 5.5)
-
-    def _draw_arrow(self, painter, fx, fy, tx, ty, color):
-        head_len = 8
-        dx = tx - fx
-        dy = ty - fy
-        a = math.atan2(dy, dx)
-        painter.setBrush(Qt.BrushStyle.NoBrush)
-        painter.setPen(QPen(color, 2, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap))
-        painter.drawLine(int(fx), int(fy), int(tx), int(ty))
-        path = QPainterPath()
-        path.moveTo(tx, ty)
-        path.lineTo(tx - head_len * math.cos(a - math.pi / 6), ty - head_len * math.sin(a - math.pi / 6))
-        path.lineTo(tx - head_len * math.cos(a + math.pi / 6), ty - head_len * math.sin(a + math.pi / 6))
-        path.closeSubpath()
-        painter.drawPath(path)
+        with profiler.frame():
+            with profiler.span("paint"):
+                samples = self.layers.paint(painter, self.rect(), self.app, self.devicePixelRatioF(),
+                                            verify=self._scene_dirty)
+                self._scene_dirty = False
+        self.app.report_samples(samples)
+        if profiler.enabled:
+            profiler.samples = samples
+            draw_profiler_hud(painter, profiler.stats())
 
 
 class AppState:
-    """Shared state and redraw trigger."""
-    def __init__(self, main_window):
+    """Shared state and redraw trigger; main_window is None when rendering headless."""
+    def __init__(self, main_window=None):
         self.main_window = main_window
-        self.segments = copy.deepcopy(EMPTY_START)
+        self.segments = make_segments(EMPTY_START)
         self.t = 0.0
         self.animate = False
         self.speed = 1.0
         self.show_casteljau = True
         self.show_hodograph = True
+        self.show_curvature = False
+        self.show_intersections = False
+        self.constant_speed = False
+        # Precision mode of lengths and curvature in the readout and the segment list (see precision.py)
+        self.precision = "fast"
+        self.zoom = 1.0
+        self.pan_x = 0.0
+        self.pan_y = 0.0
+        self.culled = 0
+        self.flatness_tol = DEFAULT_TOLERANCE
+        self.samples_drawn = 0
         self.canvas_w = DEFAULT_CANVAS_WIDTH
         self.canvas_h = DEFAULT_CANVAS_HEIGHT
-
-    def redraw(self):
-        self.main_window.refresh_ui_and_canvases()
+        self.geometry = GeometryCache()
+        self.index = SpatialIndex()
+        self.queries = QueryCache()
+        self.selected = set()
+        # Bumped when visibility, lock or selection changes; these do not touch segment versions
+        self.display_version = 0
+        self.history = History(self.segments)
+
+    def redraw(self, parts=DIRTY_ALL):
+        """Ask for a repaint of parts (DIRTY_* flags); requests are coalesced per display frame."""
+        if self.main_window is not None:
+            self.main_window.scheduler.invalidate(parts)
+
+    def commit(self, label, merge=None):
+        """Record the segments as one undo step after an edit; see History.commit."""
+        if self.history.commit(self.segments, label, merge) and self.main_window is not None:
+            self.main_window.update_history_buttons()
+
+    def report_samples(self, n):
+        self.samples_drawn = n
+        if self.main_window is not None:
+            self.main_window.lbl_info_samples.setText(f"Samples drawn: {n} ({self.culled} segments culled)")
+
+
+class RedrawScheduler:
+    """Coalesces redraw requests into at most one flush per display frame.
+
+    Requests only OR their DIRTY_* flags together; the flush repaints the
+    canvas and refreshes the readout, which is throttled separately to
+    READOUT_INTERVAL_MS on its own timer because it walks every segment.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.dirty = 0
+        self.requests = 0
+        self.flushes = 0
+        self._last_flush = -math.inf
+        self._last_readout = -math.inf
+        self._timer = QTimer(window)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self._readout_timer = QTimer(window)
+        self._readout_timer.setSingleShot(True)
+        self._readout_timer.timeout.connect(self._flush_readout)
+
+    @staticmethod
+    def _now_ms():
+        return time.perf_counter() * 1000
+
+    def invalidate(self, parts=DIRTY_ALL):
+        self.requests += 1
+        self.dirty |= parts
+        if parts & DIRTY_GEOMETRY:
+            # Also covers paints Qt starts on its own before the flush
+            self.window.bezier_canvas.mark_scene_dirty()
+        if not self._timer.isActive():
+            self._timer.start(int(max(0.0, FRAME_MS - (self._now_ms() - self._last_flush))))
+
+    def flush(self):
+        parts, self.dirty = self.dirty, 0
+        if not parts:
+            return
+        now = self._now_ms()
+        self._last_flush = now
+        self.flushes += 1
+        if parts & DIRTY_READOUT and not self._readout_timer.isActive():
+            wait = READOUT_INTERVAL_MS - (now - self._last_readout)
+            if wait <= 0:
+                self._flush_readout()
+            else:
+                self._readout_timer.start(int(wait) + 1)
+        self.window.refresh_frame(parts)
+
+    def _flush_readout(self):
+        self._last_readout = self._now_ms()
+        self.window.refresh_readout()
 
 
 class MainWindow(QMainWindow):
@@ -349,6 +1075,9 @@ class MainWindow(QMainWindow):
         self.app = AppState(self)
         self._timer = QTimer(self)
         self._timer.timeout.connect(self._animation_step)
+        self._readout_key = None
+        self.redundant_readouts = 0
+        self.app.geometry.enable_async(self._on_geometry_ready)
 
         central = QWidget()
         self.setCentralWidget(central)
@@ -400,6 +1129,21 @@ class MainWindow(QMainWindow):
         self.lbl_t.setStyleSheet("color: #9aa5ce;")
         form.addWidget(self.lbl_t)
 
+        self.chk_constant_speed = QCheckBox("Constant speed (arc length)")
+        self.chk_constant_speed.setStyleSheet("color: #c0caf5;")
+        self.chk_constant_speed.stateChanged.connect(lambda: self._set_bool("constant_speed", self.chk_constant_speed.isChecked()))
+        form.addWidget(self.chk_constant_speed)
+
+        form.addWidget(QLabel("Flatness tolerance"))
+        self.tol_slider = QSlider(Qt.Orientation.Horizontal)
+        self.tol_slider.setRange(1, 40)  # 0.05 to 2 px in 0.05 steps
+        self.tol_slider.setValue(int(round(DEFAULT_TOLERANCE * 20)))
+        self.tol_slider.valueChanged.connect(self._on_tol_changed)
+        form.addWidget(self.tol_slider)
+        self.lbl_tol = QLabel(f"{DEFAULT_TOLERANCE:.2f} px")
+        self.lbl_tol.setStyleSheet("color: #9aa5ce;")
+        form.addWidget(self.lbl_tol)
+
         self.chk_casteljau = QCheckBox("Show de Casteljau steps")
         self.chk_casteljau.setStyleSheet("color: #c0caf5;")
         self.chk_casteljau.setChecked(True)
@@ -412,6 +1156,37 @@ class MainWindow(QMainWindow):
         self.chk_hodograph.stateChanged.connect(lambda: self._set_bool("show_hodograph", self.chk_hodograph.isChecked()))
         form.addWidget(self.chk_hodograph)
 
+        self.chk_curvature = QCheckBox("Show curvature comb")
+        self.chk_curvature.setStyleSheet("color: #c0caf5;")
+        self.chk_curvature.stateChanged.connect(lambda: self._set_bool("show_curvature", self.chk_curvature.isChecked()))
+        form.addWidget(self.chk_curvature)
+
+        form.addWidget(QLabel("Readout precision"))
+        self.cmb_precision = QComboBox()
+        self.cmb_precision.addItems(PRECISION_MODES)
+        self.cmb_precision.setToolTip("fast: Horner and quadrature; stable, compensated: error-bounded, slower")
+        self.cmb_precision.currentTextChanged.connect(self._on_precision_changed)
+        form.addWidget(self.cmb_precision)
+
+        self.chk_intersections = QCheckBox("Highlight intersections")
+        self.chk_intersections.setStyleSheet("color: #c0caf5;")
+        self.chk_intersections.stateChanged.connect(lambda: self._set_bool("show_intersections", self.chk_intersections.isChecked()))
+        form.addWidget(self.chk_intersections)
+
+        self.chk_async = QCheckBox("Compute geometry in background")
+        self.chk_async.setStyleSheet("color: #c0caf5;")
+        self.chk_async.setChecked(True)
+        self.chk_async.stateChanged.connect(self._on_async_changed)
+        form.addWidget(self.chk_async)
+
+        self.chk_profiler = QCheckBox("Show profiler HUD")
+        self.chk_profiler.setStyleSheet("color: #c0caf5;")
+        self.chk_profiler.stateChanged.connect(self._on_profiler_changed)
+        form.addWidget(self.chk_profiler)
+        btn_trace = QPushButton("Export trace…")
+        btn_trace.clicked.connect(self._export_trace)
+        form.addWidget(btn_trace)
+
         btn_add = QPushButton("Add segment")
         btn_add.clicked.connect(self._add_segment)
         form.addWidget(btn_add)
@@ -419,6 +1194,36 @@ class MainWindow(QMainWindow):
         btn_remove.clicked.connect(self._remove_segment)
         form.addWidget(btn_remove)
 
+        ops = QHBoxLayout()
+        for text, handler in (("Split at t", self._split_segments), ("Elevate", self._elevate_segments),
+                              ("Reduce", self._reduce_segments), ("To cubics", self._segments_to_cubics)):
+            btn = QPushButton(text)
+            btn.clicked.connect(handler)
+            ops.addWidget(btn)
+        form.addLayout(ops)
+
+        btn_save = QPushButton("Save scene…")
+        btn_save.clicked.connect(self._save_scene)
+        form.addWidget(btn_save)
+        btn_load = QPushButton("Load scene…")
+        btn_load.clicked.connect(self._load_scene)
+        form.addWidget(btn_load)
+
+        btn_view = QPushButton("Reset view")
+        btn_view.clicked.connect(self._reset_view)
+        form.addWidget(btn_view)
+
+        history_row = QHBoxLayout()
+        self.btn_undo = QPushButton("Undo")
+        self.btn_undo.clicked.connect(self._undo)
+        history_row.addWidget(self.btn_undo)
+        self.btn_redo = QPushButton("Redo")
+        self.btn_redo.clicked.connect(self._redo)
+        history_row.addWidget(self.btn_redo)
+        form.addLayout(history_row)
+        QShortcut(QKeySequence.StandardKey.Undo, self, self._undo)
+        QShortcut(QKeySequence.StandardKey.Redo, self, self._redo)
+
         btn_reset = QPushButton("Reset")
         btn_reset.setStyleSheet("background: #7aa2f7; color: #1a1b26;")
         btn_reset.clicked.connect(self._reset)
@@ -436,19 +1241,73 @@ class MainWindow(QMainWindow):
             ("Red — Bezier curve", "red"),
             ("Blue — Hodograph (derivative B′(t))", "blue"),
             ("Green — Speed / tangent vector at t", "green"),
+            ("Purple — Curvature comb, squares at inflections", "purple"),
+            ("Yellow dots — Intersections", "yellow"),
         ]:
             l = QLabel(f"  {text}")
             l.setStyleSheet(f"color: #9aa5ce;")
             leg_layout.addWidget(l)
         side_layout.addWidget(leg_grp)
 
+        # Segment list — a virtualized table; stats are computed only for rows on screen
+        list_grp = QGroupBox("Segments")
+        list_grp.setStyleSheet("QGroupBox { font-weight: bold; color: #9aa5ce; }")
+        list_layout = QVBoxLayout(list_grp)
+        self.segment_model = SegmentListModel(self.app, self._flags_changed, self)
+        self.app.geometry.on_measured = self.segment_model.segment_measured
+        self.segment_view = QTableView()
+        self.segment_view.setModel(self.segment_model)
+        self.segment_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.segment_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.segment_view.verticalHeader().setVisible(False)
+        # Fixed row heights keep scrolling O(1) instead of measuring every row
+        self.segment_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.segment_view.verticalHeader().setDefaultSectionSize(LIST_ROW_HEIGHT)
+        self.segment_view.horizontalHeader().setStretchLastSection(True)
+        self.segment_view.setMinimumHeight(180)
+        self.segment_view.selectionModel().selectionChanged.connect(self._on_list_selection)
+        list_layout.addWidget(self.segment_view)
+        bulk = QHBoxLayout()
+        for text, handler in (("Delete", self._delete_selected),
+                              ("Hide", lambda: self._set_selected_flag("visible", False)),
+                              ("Show", lambda: self._set_selected_flag("visible", True)),
+                              ("Lock", lambda: self._set_selected_flag("locked", True)),
+                              ("Unlock", lambda: self._set_selected_flag("locked", False))):
+            btn = QPushButton(text)
+            btn.clicked.connect(handler)
+            bulk.addWidget(btn)
+        list_layout.addLayout(bulk)
+        move = QHBoxLayout()
+        self.spin_dx = QSpinBox()
+        self.spin_dy = QSpinBox()
+        for label, spin in (("dx", self.spin_dx), ("dy", self.spin_dy)):
+            spin.setRange(-2000, 2000)
+            spin.setValue(10 if label == "dx" else 0)
+            move.addWidget(QLabel(label))
+            move.addWidget(spin)
+        btn_move = QPushButton("Move selected")
+        btn_move.clicked.connect(self._move_selected)
+        move.addWidget(btn_move)
+        list_layout.addLayout(move)
+        side_layout.addWidget(list_grp)
+
         # Readout
         read_grp = QGroupBox("Readout")
         read_grp.setStyleSheet("QGroupBox { font-weight: bold; color: #9aa5ce; }")
         read_layout = QVBoxLayout(read_grp)
         self.lbl_info_t = QLabel("t = 0.00")
         self.lbl_info_len = QLabel("Length ≈ 0 px")
-        for l in (self.lbl_info_t, self.lbl_info_len):
+        self.lbl_info_samples = QLabel("Samples drawn: 0")
+        self.lbl_info_curv = QLabel("Max curvature: —")
+        self.lbl_info_infl = QLabel("Inflections: —")
+        self.lbl_info_infl.setWordWrap(True)
+        self.lbl_info_isect = QLabel("Intersections: —")
+        self.lbl_info_op = QLabel("Last operation: —")
+        self.lbl_info_op.setWordWrap(True)
+        self.lbl_info_redraw = QLabel("Redraws: —")
+        self.lbl_info_redraw.setWordWrap(True)
+        for l in (self.lbl_info_t, self.lbl_info_len, self.lbl_info_samples, self.lbl_info_curv, self.lbl_info_infl,
+                  self.lbl_info_isect, self.lbl_info_op, self.lbl_info_redraw):
             l.setStyleSheet("color: #9aa5ce;")
             read_layout.addWidget(l)
         side_layout.addWidget(read_grp)
@@ -458,9 +1317,10 @@ class MainWindow(QMainWindow):
         inst_grp.setStyleSheet("QGroupBox { font-weight: bold; color: #9aa5ce; }")
         inst_layout = QVBoxLayout(inst_grp)
         inst_text = (
-            "Shift + left click → add control point\n"
+            "Shift + left click → add control point (on a curve: into that segment)\n"
             "Left click + drag → move control point\n"
             "Right click → delete nearest point (min 2 per segment)\n"
+            "Ctrl+Z / Ctrl+Shift+Z → undo / redo\n"
             "Reset → clear canvas (empty)"
         )
         inst_lbl = QLabel(inst_text)
@@ -509,54 +1369,287 @@ class MainWindow(QMainWindow):
             QPushButton:hover { background: #2c3550; }
             QSpinBox, QSlider { color: #c0caf5; }
         """)
-        self.refresh_ui_and_canvases()
+        self.scheduler = RedrawScheduler(self)
+        self.update_history_buttons()
+        self.refresh_readout()
+        self.refresh_frame(DIRTY_ALL)
 
     def _set_bool(self, name, value):
         setattr(self.app, name, value)
         self.app.redraw()
 
+    def _on_precision_changed(self, mode):
+        self.app.precision = mode
+        self.app.redraw(DIRTY_READOUT)
+
     def _on_animate_changed(self):
         self.app.animate = self.chk_animate.isChecked()
         if self.app.animate:
             self._timer.start(16)  # ~60 fps
         else:
             self._timer.stop()
+        self.app.redraw(DIRTY_OVERLAY)
+
+    def _on_async_changed(self):
+        if self.chk_async.isChecked():
+            self.app.geometry.enable_async(self._on_geometry_ready)
+        else:
+            self.app.geometry.disable_async()
+        self.app.redraw()
+
+    def _on_geometry_ready(self):
+        # Results arrive one segment at a time; the scheduler folds them into the next frame
+        self.app.redraw(DIRTY_GEOMETRY | DIRTY_READOUT)
+
+    def _on_profiler_changed(self):
+        profiler.enabled = self.chk_profiler.isChecked()
+        if profiler.enabled:
+            profiler.reset()
         self.app.redraw()
 
+    def _export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export trace", "trace.json", "Chrome trace (*.json)")
+        if not path:
+            return
+        try:
+            profiler.export_chrome_trace(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Export trace", str(e))
+
     def _on_speed_changed(self):
         v = self.speed_slider.value() / 10.0
         self.app.speed = v
         self.lbl_speed.setText(f"{v}×")
+
+    def _on_tol_changed(self):
+        self.app.flatness_tol = self.tol_slider.value() / 20.0
+        self.lbl_tol.setText(f"{self.app.flatness_tol:.2f} px")
         self.app.redraw()
 
     def _on_t_changed(self):
         self.app.t = self.t_slider.value() / 100.0
         self.lbl_t.setText(f"{self.app.t:.2f}")
-        self.app.redraw()
+        self.app.redraw(DIRTY_OVERLAY)
 
     def _animation_step(self):
-        self.app.t += 0.002 * self.app.speed
+        self.app.t += ANIMATION_STEP * self.app.speed
         if self.app.t > 1:
             self.app.t = 0
-        self.t_slider.setValue(int(round(self.app.t * 100)))
+        # Without the blocker _on_t_changed would redraw again and round t to the slider's 0.01 steps
+        with QSignalBlocker(self.t_slider):
+            self.t_slider.setValue(int(round(self.app.t * 100)))
         self.lbl_t.setText(f"{self.app.t:.2f}")
-        self.app.redraw()
+        self.app.redraw(DIRTY_OVERLAY)
 
     def _add_segment(self):
-        self.app.segments.append([
-            {"x": 150, "y": 350},
-            {"x": 350, "y": 150},
-            {"x": 600, "y": 350},
-        ])
-        self.app.redraw()
+        """Default arch in the middle of the view, shifted per segment so new ones do not coincide."""
+        app = self.app
+        shift = NEW_SEGMENT_STEP * (len(app.segments) % 10)
+        origin = (app.pan_x + app.canvas_w / app.zoom / 2 + shift, app.pan_y + app.canvas_h / app.zoom / 2 + shift)
+        arch = np.array([(-250, 100), (-50, -100), (200, 100)]) / app.zoom + origin
+        app.segments.append(Segment(arch))
+        app.commit("Add segment")
+        app.redraw()
 
     def _remove_segment(self):
-        if len(self.app.segments) > 1:
-            self.app.segments.pop()
+        """Remove the selected segments, or the last unlocked one when nothing is selected."""
+        if self.app.selected:
+            self._delete_selected()
+            return
+        segments = self.app.segments
+        last = next((i for i in range(len(segments) - 1, -1, -1) if not segments[i].locked), None)
+        if last is None or len(segments) <= 1:
+            self.lbl_info_op.setText("Last operation: nothing removed, the remaining segments are locked"
+                                     if last is None else "Last operation: the last segment is kept")
+            return
+        del segments[last]
+        self.app.commit("Remove segment")
+        self.app.redraw()
+
+    # Segment list — bulk operations on the selection
+
+    def _selected_segments(self):
+        return [seg for seg in self.app.segments if seg.uid in self.app.selected]
+
+    def _on_list_selection(self):
+        # Walk the selection ranges; selectedRows() would query every cell
+        segments = self.app.segments
+        self.app.selected = {segments[row].uid for r in self.segment_view.selectionModel().selection()
+                             for row in range(r.top(), min(r.bottom() + 1, len(segments)))}
+        self.app.display_version += 1
+        self.app.redraw(DIRTY_GEOMETRY)
+
+    def _flags_changed(self, label="Change visibility/lock"):
+        self.app.commit(label)
+        self.app.display_version += 1
+        self.app.redraw(DIRTY_GEOMETRY | DIRTY_READOUT)
+
+    def _delete_selected(self):
+        """Delete the selected segments; locked ones stay, as with every other edit."""
+        if not self.app.selected:
+            return
+        doomed = {seg.uid for seg in self._selected_segments() if not seg.locked}
+        if not doomed:
+            self.lbl_info_op.setText("Last operation: nothing deleted, the selected segments are locked")
+            return
+        kept = len(self.app.selected) - len(doomed)
+        self.app.segments = without(self.app.segments, doomed)
+        self.app.selected -= doomed
+        self.lbl_info_op.setText(f"Last operation: deleted {len(doomed)} segment(s)"
+                                 + (f", {kept} locked kept" if kept else ""))
+        self._flags_changed("Delete segments")
+
+    def _set_selected_flag(self, name, value):
+        for seg in self._selected_segments():
+            setattr(seg, name, value)
+        self._flags_changed(f"{'Show' if value else 'Hide'} segments" if name == "visible"
+                            else f"{'Lock' if value else 'Unlock'} segments")
+
+    def _move_selected(self):
+        segs = [seg for seg in self._selected_segments() if not seg.locked]
+        if segs:
+            translate_segments(segs, self.spin_dx.value(), self.spin_dy.value())
+            # Repeated clicks on the same selection merge into one step
+            self.app.commit("Move segments", merge=("move", frozenset(self.app.selected)))
             self.app.redraw()
 
+    # Curve operators — applied to every unlocked segment at once
+
+    def _replace_segments(self, segments, message):
+        self.app.segments = segments
+        self.app.commit(message)
+        self.lbl_info_op.setText(f"Last operation: {message}")
+        self.app.redraw()
+
+    def _replace_pieces(self, pieces, message):
+        """Replace every segment with an entry in pieces (id -> point arrays) by those pieces.
+
+        Pieces keep the segment's flags, a lone piece also its uid; a
+        selected segment passes the selection on to all its pieces.
+        """
+        selected = self.app.selected
+        out = []
+        for seg in self.app.segments:
+            arrays = pieces.get(id(seg))
+            if arrays is None:
+                out.append(seg)
+                continue
+            new = [seg.derive(p, keep_uid=len(arrays) == 1) for p in arrays]
+            if seg.uid in selected and len(new) > 1:
+                selected.discard(seg.uid)
+                selected.update(s.uid for s in new)
+            out.extend(new)
+        self._replace_segments(out, message)
+
+    def _operands(self, min_points):
+        return [seg for seg in self.app.segments if len(seg) >= min_points and not seg.locked]
+
+    def _split_segments(self):
+        segs = self._operands(2)
+        if not segs:
+            return
+        if self.app.constant_speed:
+            ts = [self.app.geometry.analysis(seg).param(self.app.t, True) for seg in segs]
+        else:
+            # The slider value is the curve parameter itself; no arc-length table needed
+            ts = [self.app.t] * len(segs)
+        # Splitting at an end would leave a zero-length piece next to a full copy
+        inner = [(seg, t) for seg, t in zip(segs, ts) if SPLIT_EPS < t < 1 - SPLIT_EPS]
+        if not inner:
+            self.lbl_info_op.setText("Last operation: split skipped, t is at an end of the segments")
+            return
+        segs, ts = zip(*inner)
+        lefts, rights = split_all([seg.points for seg in segs], ts)
+        self._replace_pieces({id(seg): (l, r) for seg, l, r in zip(segs, lefts, rights)},
+                             f"split {len(segs)} segment(s) at t")
+
+    def _elevate_segments(self):
+        segs = self._operands(2)
+        if not segs:
+            return
+        raised = elevate_all([seg.points for seg in segs])
+        self._replace_pieces({id(seg): (p,) for seg, p in zip(segs, raised)}, f"elevated {len(segs)} segment(s)")
+
+    def _reduce_segments(self):
+        segs = self._operands(3)
+        if not segs:
+            return
+        reduced, bounds = reduce_all([seg.points for seg in segs])
+        self._replace_pieces({id(seg): (p,) for seg, p in zip(segs, reduced)},
+                             f"reduced {len(segs)} segment(s), error ≤ {bounds.max():.3g} px")
+
+    def _segments_to_cubics(self):
+        segs = self._operands(5)
+        if not segs:
+            return
+        chains, bounds = cubic_chains([seg.points for seg in segs], CUBIC_CHAIN_TOL)
+        pieces = sum(len(c) for c in chains)
+        self._replace_pieces(dict(zip(map(id, segs), chains)),
+                             f"{len(segs)} segment(s) → {pieces} cubics, error ≤ {bounds.max():.3g} px")
+
+    def _save_scene(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save scene", "", SCENE_FILTER)
+        if not path:
+            return
+        try:
+            save_scene(path, self.app.segments, self._release_mapped)
+        except OSError as e:
+            QMessageBox.warning(self, "Save scene", str(e))
+
+    def _release_mapped(self):
+        """Let go of arrays mapped from a loaded binary scene, so its file can be replaced."""
+        self.app.history.detach()
+        self.app.geometry.prune(self.app.segments)
+        self.app.queries.prune(self.app.segments)
+
+    def _load_scene(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load scene", "", SCENE_FILTER)
+        if not path:
+            return
+        try:
+            segments = load_scene(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Load scene", str(e))
+            return
+        self.app.segments = segments or make_segments(EMPTY_START)
+        self.app.commit("Load scene")
+        self.app.redraw()
+
+    def _reset_view(self):
+        self.app.zoom = 1.0
+        self.app.pan_x = self.app.pan_y = 0.0
+        self.app.redraw()
+
+    def _undo(self):
+        self._step_history(self.app.history.undo_label, self.app.history.undo, "Undid")
+
+    def _redo(self):
+        self._step_history(self.app.history.redo_label, self.app.history.redo, "Redid")
+
+    def _step_history(self, label, step, verb):
+        """Swap in the segments of the neighbouring entry; unchanged segments keep their cached geometry."""
+        segments = step()
+        if segments is None:
+            return
+        self.app.segments = segments
+        # Restored visibility and lock flags do not bump segment versions
+        self.app.display_version += 1
+        self.lbl_info_op.setText(f"Last operation: {verb} {label.lower()}")
+        self.update_history_buttons()
+        self.app.redraw()
+
+    def update_history_buttons(self):
+        history = self.app.history
+        self.btn_undo.setEnabled(history.can_undo)
+        self.btn_redo.setEnabled(history.can_redo)
+        self.btn_undo.setToolTip(f"Undo {history.undo_label.lower()}" if history.can_undo else "")
+        self.btn_redo.setToolTip(f"Redo {history.redo_label.lower()}" if history.can_redo else "")
+
     def _reset(self):
-        self.app.segments = copy.deepcopy(EMPTY_START)
+        self.app.segments = make_segments(EMPTY_START)
+        self.app.commit("Reset")
+        self.app.zoom = 1.0
+        self.app.pan_x = self.app.pan_y = 0.0
         self.app.t = 0
         self.app.animate = False
         self.chk_animate.setChecked(False)
@@ -565,14 +1658,97 @@ class MainWindow(QMainWindow):
         self.lbl_t.setText("0.00")
         self.app.redraw()
 
-    def refresh_ui_and_canvases(self):
-        total_len = sum(approximate_length(seg) for seg in self.app.segments if len(seg) >= 2)
+    def refresh_frame(self, parts):
+        """Cheap per-frame updates: the t label, the redraw counters, the segment list and a canvas repaint."""
         self.lbl_info_t.setText(f"t = {self.app.t:.2f}")
-        self.lbl_info_len.setText(f"Length ≈ {total_len:.1f} px")
+        if parts & DIRTY_GEOMETRY and self.segment_model.sync():
+            # Rows were rebuilt; drop uids that are gone and reselect the rest
+            live = {seg.uid for seg in self.app.segments}
+            self.app.selected &= live
+            with QSignalBlocker(self.segment_view.selectionModel()):
+                self.segment_model.select_uids(self.segment_view.selectionModel(), self.app.selected)
+        sched = self.scheduler
+        self.lbl_info_redraw.setText(
+            f"Redraws: {sched.flushes} frames for {sched.requests} requests, "
+            f"{self.redundant_readouts} redundant readouts skipped")
         self.bezier_canvas.update()
 
+    def _readout_inputs(self):
+        segments = self.app.segments
+        return (tuple(map(id, segments)), tuple(map(attrgetter("version"), segments)), self.app.geometry.measured,
+                self.app.show_curvature, self.app.show_intersections, self.app.display_version, self.app.precision)
+
+    def refresh_readout(self):
+        """Lengths, curvature and intersections; skipped (and counted) when none of their inputs changed."""
+        if self._readout_key == self._readout_inputs():
+            self.redundant_readouts += 1
+            return
+        geometry = self.app.geometry
+        geometry.precision = self.app.precision
+        geometry.prune(self.app.segments)
+        self.app.queries.prune(self.app.segments)
+        with profiler.span("readout"):
+            # Analyses still being measured on the pool are left out until they arrive
+            analyses = [a for a in (geometry.analysis(seg, wait=False) for seg in self.app.segments if len(seg) >= 2)
+                        if a is not None]
+            total_len = math.fsum(a.length for a in analyses)
+        if self.app.precision == "fast":
+            self.lbl_info_len.setText(f"Length ≈ {total_len:.1f} px")
+        else:
+            bound = math.fsum(a.length_error for a in analyses)
+            self.lbl_info_len.setText(f"Length = {total_len:.6f} ± {bound:.1e} px ({self.app.precision})")
+        if self.app.show_curvature:
+            self._refresh_curvature_readout()
+        else:
+            self.lbl_info_curv.setText("Max curvature: —")
+            self.lbl_info_infl.setText("Inflections: —")
+        if self.app.show_intersections:
+            with profiler.span("intersections"):
+                count = len(scene_crossings(self.app, [seg for seg in self.app.segments if seg.visible], wait=False))
+            self.lbl_info_isect.setText(f"Intersections: {count}")
+        else:
+            self.lbl_info_isect.setText("Intersections: —")
+        # Taken afterwards, since synchronous analyses count as measured
+        self._readout_key = self._readout_inputs()
 
-def main():
+    def _refresh_curvature_readout(self):
+        best = None
+        inflections = []
+        for si, seg in enumerate(self.app.segments):
+            if len(seg) < 3:
+                continue
+            # Curvature is built on the pool; segments without it yet are left out like the lengths
+            analysis = self.app.geometry.analysis(seg, wait=False, curvature=True)
+            if analysis is None:
+                continue
+            ca = analysis.curvature
+            if best is None or ca.max_curvature > best[0]:
+                best = (ca.max_curvature, si, ca.max_t)
+            inflections += [(si, t) for t in ca.inflections.tolist()]
+        if best is None:
+            self.lbl_info_curv.setText("Max curvature: —")
+        else:
+            k, si, t = best
+            error = ""
+            if self.app.precision != "fast":
+                # Only the reported peak is re-evaluated in the chosen mode
+                ks, bounds = bounded_curvature(self.app.segments[si].points, [t], self.app.precision)
+                k, error = abs(float(ks[0])), f" ± {float(bounds[0]):.1e}"
+            radius = f", R ≈ {1 / k:.1f} px" if k > 0 else ""
+            self.lbl_info_curv.setText(f"Max curvature: {k:.4g}{error} /px (seg {si + 1}, t = {t:.3f}{radius})")
+        shown = ", ".join(f"{si + 1}@{t:.3f}" for si, t in inflections[:8])
+        more = f" … (+{len(inflections) - 8})" if len(inflections) > 8 else ""
+        self.lbl_info_infl.setText(f"Inflections: {len(inflections)}" + (f" — {shown}{more}" if inflections else ""))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "render":
+        import headless
+        return headless.main(argv[1:])
+    if argv and argv[0] == "record":
+        import headless
+        return headless.record_main(argv[1:])
     app = QApplication([])
     app.setStyle("Fusion")
     win = MainWindow()
@@ -582,4 +1758,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
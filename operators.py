@@ -0,0 +1,192 @@
+"""Curve operators: split, degree elevation, degree reduction and cubic chains.
+
+The batch functions take a list of control-point arrays, stack the segments of
+each degree into one (K, n+1, 2) array and transform them with one kernel per
+degree. Reduction and conversion report an error bound that holds for the
+whole curve: the difference of two curves of degree n is a Bezier curve whose
+control points are the differences, so by the convex-hull property the curves
+never drift further apart than the largest of those differences.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from bezier_eval import COEFF_CACHE_SIZE, as_points
+from flatten import split_batch
+
+MAX_CHAIN_PIECES = 256
+BOUND_SPLITS = 4
+
+
+def _by_degree(ctrls):
+    """(indices, stacked control points) for each group of same-degree segments."""
+    groups = {}
+    for i, c in enumerate(ctrls):
+        groups.setdefault(len(c), []).append(i)
+    for count, idx in groups.items():
+        yield idx, np.stack([ctrls[i] for i in idx]).reshape(len(idx), count, 2)
+
+
+def _apply(matrix, stacked):
+    """matrix @ ctrl for every ctrl in stacked (K, n+1, 2), as one BLAS product."""
+    return np.tensordot(stacked, matrix, axes=([1], [1])).transpose(0, 2, 1)
+
+
+# Split
+
+def split_all(ctrls, ts):
+    """Left and right halves of every segment, each split at its own t."""
+    ctrls = [as_points(c) for c in ctrls]
+    ts = np.broadcast_to(np.asarray(ts, dtype=np.float64), (len(ctrls),))
+    lefts, rights = [None] * len(ctrls), [None] * len(ctrls)
+    for idx, stacked in _by_degree(ctrls):
+        left, right = split_batch(stacked, ts[idx][:, None, None])
+        for k, i in enumerate(idx):
+            lefts[i], rights[i] = left[k], right[k]
+    return lefts, rights
+
+
+# Degree elevation and reduction
+
+@lru_cache(maxsize=COEFF_CACHE_SIZE)
+def elevation_matrix(n, m):
+    """Matrix mapping the n + 1 control points of a curve to the same curve at degree m >= n."""
+    E = np.eye(n + 1)
+    for d in range(n, m):
+        step = np.zeros((d + 2, d + 1))
+        i = np.arange(d + 2)
+        a = i / (d + 1)
+        step[i[1:], i[1:] - 1] = a[1:]
+        step[i[:-1], i[:-1]] = 1 - a[:-1]
+        E = step @ E
+    E.setflags(write=False)
+    return E
+
+
+@lru_cache(maxsize=COEFF_CACHE_SIZE)
+def reduction_matrix(n, m):
+    """Matrix mapping n + 1 control points to m + 1 with the same end points.
+
+    The inner points minimise the squared distance between the original
+    control points and those of the reduced curve elevated back to degree n,
+    which is the quantity the error bound is taken over.
+    """
+    E = elevation_matrix(m, n)
+    R = np.zeros((m + 1, n + 1))
+    R[0, 0] = 1.0
+    R[m, n] = 1.0
+    if m >= 2:
+        fixed = np.zeros((n + 1, n + 1))
+        fixed[:, 0] = E[:, 0]
+        fixed[:, n] += E[:, m]
+        R[1:m] = np.linalg.pinv(E[:, 1:m]) @ (np.eye(n + 1) - fixed)
+    R.setflags(write=False)
+    return R
+
+
+def _bound(reduced, original):
+    """Upper bound on the distance between reduced (K, m+1, 2) and original (K, n+1, 2).
+
+    The difference curve is cut into 2**BOUND_SPLITS pieces first, whose
+    control points hug it far more closely than the uncut ones.
+    """
+    n = original.shape[1] - 1
+    m = reduced.shape[1] - 1
+    diff = _apply(elevation_matrix(m, n), reduced) - original
+    if n >= 2:
+        diff = _apply(piece_matrices(n, 1 << BOUND_SPLITS).reshape(-1, n + 1), diff)
+    return np.hypot(diff[..., 0], diff[..., 1]).max(axis=1)
+
+
+def elevate_all(ctrls, times=1):
+    """Every segment raised by times degrees; the curves are unchanged."""
+    ctrls = [as_points(c) for c in ctrls]
+    out = [None] * len(ctrls)
+    for idx, stacked in _by_degree(ctrls):
+        n = stacked.shape[1] - 1
+        if n < 0:
+            for i in idx:
+                out[i] = ctrls[i].copy()
+            continue
+        raised = _apply(elevation_matrix(n, n + times), stacked)
+        for k, i in enumerate(idx):
+            out[i] = raised[k]
+    return out
+
+
+def reduce_all(ctrls, times=1):
+    """Every segment lowered by times degrees (not below 1), and the error bound of each."""
+    ctrls = [as_points(c) for c in ctrls]
+    out = [None] * len(ctrls)
+    bounds = np.zeros(len(ctrls))
+    for idx, stacked in _by_degree(ctrls):
+        n = stacked.shape[1] - 1
+        m = max(1, n - times)
+        if m >= n:
+            for i in idx:
+                out[i] = ctrls[i].copy()
+            continue
+        reduced = _apply(reduction_matrix(n, m), stacked)
+        err = _bound(reduced, stacked)
+        for k, i in enumerate(idx):
+            out[i] = reduced[k]
+            bounds[i] = err[k]
+    return out, bounds
+
+
+# Cubic chains
+
+@lru_cache(maxsize=COEFF_CACHE_SIZE)
+def piece_matrices(n, count):
+    """Matrices (count, n+1, n+1) mapping control points to those of the pieces [j / count, (j + 1) / count]."""
+    j = np.arange(count)
+    a, b = j / count, (j + 1) / count
+    basis = np.broadcast_to(np.eye(n + 1), (count, n + 1, n + 1))
+    head = split_batch(basis, b[:, None, None])[0]
+    # Splitting the head [0, b] at a / b leaves [a, b] on the right
+    M = split_batch(head, (a / b)[:, None, None])[1]
+    M.setflags(write=False)
+    return M
+
+
+def _hermite_cubics(pieces):
+    """Cubics matching end points and end derivatives of pieces (..., n+1, 2) of degree n >= 1."""
+    n = pieces.shape[-2] - 1
+    p0, p3 = pieces[..., 0, :], pieces[..., -1, :]
+    p1 = p0 + n / 3 * (pieces[..., 1, :] - p0)
+    p2 = p3 - n / 3 * (p3 - pieces[..., -2, :])
+    return np.stack((p0, p1, p2, p3), axis=-2)
+
+
+def cubic_chains(ctrls, tol, max_pieces=MAX_CHAIN_PIECES):
+    """Each segment as a list of C1-continuous cubics within tol, and the error bound of each chain.
+
+    The curve is cut into 1, 2, 4, ... equal parameter ranges; each range is
+    replaced by the cubic with the same end points and end derivatives, so
+    neighbouring cubics meet with equal tangents. Segments of degree 3 or less
+    are elevated exactly instead.
+    """
+    ctrls = [as_points(c) for c in ctrls]
+    chains = [None] * len(ctrls)
+    bounds = np.zeros(len(ctrls))
+    for idx, stacked in _by_degree(ctrls):
+        n = stacked.shape[1] - 1
+        if n <= 3:
+            cubics = _apply(elevation_matrix(n, 3), stacked) if n >= 0 else stacked
+            for k, i in enumerate(idx):
+                chains[i] = [cubics[k]] if n >= 0 else []
+            continue
+        todo = np.arange(len(idx))
+        count = 1
+        while len(todo):
+            pieces = _apply(piece_matrices(n, count).reshape(-1, n + 1), stacked[todo]).reshape(len(todo), count, n + 1, 2)
+            cubics = _hermite_cubics(pieces)
+            err = _bound(cubics.reshape(-1, 4, 2), pieces.reshape(-1, n + 1, 2)).reshape(len(todo), count).max(axis=1)
+            ok = (err <= tol) | (2 * count > max_pieces)
+            for k in np.nonzero(ok)[0]:
+                i = idx[todo[k]]
+                chains[i] = list(cubics[k])
+                bounds[i] = err[k]
+            todo = todo[~ok]
+            count *= 2
+    return chains, bounds
@@ -0,0 +1,221 @@
+"""Derivatives, curvature and length with a selectable precision mode and an error bound.
+
+    fast         Bernstein-form Horner on the difference-matrix hodograph (what
+                 the canvas uses) and Gauss-Legendre length
+    stable       de Casteljau on hodograph control points built by repeated
+                 differences; length bracketed between chord and control polygon
+    compensated  like stable, with error-free transformations (TwoSum,
+                 TwoProduct) so the result is about as accurate as if computed
+                 in twice the working precision; lengths are summed with fsum
+
+Every function returns the values together with an absolute bound on their
+error. The bounds of stable and compensated are a priori floating-point
+bounds (Higham, "Accuracy and Stability of Numerical Algorithms"; Langlois et
+al., "Compensated de Casteljau algorithm"); the fast length bound is the
+change between the last two quadrature refinements, an estimate rather than a
+guarantee.
+"""
+import math
+
+import numpy as np
+
+from arclength import ArcLengthTable
+from bezier_eval import as_points, difference_matrix, evaluate
+from operators import piece_matrices
+
+MODES = ("fast", "stable", "compensated")
+UNIT_ROUNDOFF = np.finfo(np.float64).eps / 2
+LENGTH_TOL = 1e-6
+MAX_PIECES = 1 << 16
+_SPLITTER = 2.0 ** 27 + 1
+
+
+def gamma(k):
+    """Higham's gamma_k = k u / (1 - k u), the bound of k stacked roundings."""
+    return k * UNIT_ROUNDOFF / (1 - k * UNIT_ROUNDOFF)
+
+
+def _check_mode(mode):
+    if mode not in MODES:
+        raise ValueError(f"unknown precision mode {mode!r}, expected one of {', '.join(MODES)}")
+
+
+# Error-free transformations, elementwise on arrays
+
+def two_sum(a, b):
+    """s, e with s = fl(a + b) and a + b = s + e exactly."""
+    s = a + b
+    z = s - a
+    return s, (a - (s - z)) + (b - z)
+
+
+def _split(a):
+    c = _SPLITTER * a
+    hi = c - (c - a)
+    return hi, a - hi
+
+
+def two_prod(a, b):
+    """p, e with p = fl(a * b) and a * b = p + e exactly (Dekker's product)."""
+    p = a * b
+    ah, al = _split(a)
+    bh, bl = _split(b)
+    return p, al * bl - (((p - ah * bh) - al * bh) - ah * bl)
+
+
+# Evaluation
+
+def derivative_points(ctrl, order=1, compensated=False):
+    """Control points of the order-th derivative by repeated scaled differences.
+
+    Returns (hi, lo, magnitude): hi + lo are the control points (lo is zero
+    unless compensated, in which case it holds the rounding errors of the
+    differences), and magnitude is the same construction applied to |ctrl|,
+    which scales the error bounds.
+    """
+    ctrl = as_points(ctrl)
+    n = len(ctrl) - 1
+    if n < order:
+        zero = np.zeros((1, 2))
+        return zero, zero, zero
+    hi = ctrl
+    lo = np.zeros_like(ctrl)
+    mag = np.abs(ctrl)
+    for r in range(order):
+        m = float(n - r)
+        d, e = two_sum(hi[1:], -hi[:-1]) if compensated else (hi[1:] - hi[:-1], 0.0)
+        lo = (lo[1:] - lo[:-1] + e) * m
+        hi, e = two_prod(d, m) if compensated else (d * m, 0.0)
+        lo = lo + e
+        mag = (mag[1:] + mag[:-1]) * m
+    return hi, lo, mag
+
+
+def _de_casteljau(ctrl, ts):
+    """B(t) for every t, one convex combination per level over all t at once."""
+    t = ts[:, None, None]
+    s = 1.0 - t
+    b = np.broadcast_to(ctrl, (len(ts),) + ctrl.shape)
+    for _ in range(len(ctrl) - 1):
+        b = s * b[:, :-1] + t * b[:, 1:]
+    return b[:, 0]
+
+
+def _comp_de_casteljau(hi, lo, ts):
+    """Compensated de Casteljau: the level values and their running error terms."""
+    t = ts[:, None, None]
+    r, rho = two_sum(1.0, -t)
+    b = np.broadcast_to(hi, (len(ts),) + hi.shape)
+    db = np.broadcast_to(lo, (len(ts),) + lo.shape)
+    for _ in range(len(hi) - 1):
+        s, ps = two_prod(r, b[:, :-1])
+        v, pv = two_prod(t, b[:, 1:])
+        nb, sigma = two_sum(s, v)
+        db = r * db[:, :-1] + t * db[:, 1:] + (ps + pv + sigma + rho * b[:, :-1])
+        b = nb
+    return b[:, 0] + db[:, 0]
+
+
+def evaluate_bounded(ctrl, ts, order=0, mode="stable"):
+    """order-th derivative at ts as (values (N, 2), bounds (N,)), bounds on the Euclidean error."""
+    _check_mode(mode)
+    ctrl = as_points(ctrl)
+    ts = np.asarray(ts, dtype=np.float64).reshape(-1)
+    n = len(ctrl) - 1
+    if n < order:
+        return np.zeros((ts.size, 2)), np.zeros(ts.size)
+    m = n - order
+    hi, lo, mag = derivative_points(ctrl, order, compensated=mode == "compensated")
+    # Sum |d_i| b_i(t), the condition-number-like scale all bounds share
+    scale = np.hypot(*_de_casteljau(mag, ts).T) * (1 + gamma(3 * m + 2))
+    if mode == "fast":
+        values = evaluate(difference_matrix(n, order) @ ctrl, ts)
+        # Matrix product, then Horner in s = t / (1 - t) with a final power of (1 - t) or t
+        return values, gamma(n + 1 + 4 * m + 4) * scale
+    if mode == "stable":
+        values = _de_casteljau(hi, ts)
+        return values, gamma(3 * m + 2 * order + 1) * scale
+    values = _comp_de_casteljau(hi, lo, ts)
+    bound = UNIT_ROUNDOFF * np.hypot(*values.T) + (2 * gamma(3 * m + 2) ** 2 + gamma(2 * order + 2) * UNIT_ROUNDOFF) * scale
+    return values, bound
+
+
+def curvature(ctrl, ts, mode="stable"):
+    """Signed curvature at ts and a bound on its error; inf where the speed is within its own error of 0."""
+    v, ev = evaluate_bounded(ctrl, ts, 1, mode)
+    a, ea = evaluate_bounded(ctrl, ts, 2, mode)
+    speed = np.hypot(v[:, 0], v[:, 1])
+    accel = np.hypot(a[:, 0], a[:, 1])
+    cross = v[:, 0] * a[:, 1] - v[:, 1] * a[:, 0]
+    k = np.divide(cross, speed ** 3, out=np.zeros_like(cross), where=speed > 0)
+    d_cross = (speed + ev) * ea + accel * ev + gamma(2) * (np.abs(v[:, 0] * a[:, 1]) + np.abs(v[:, 1] * a[:, 0]))
+    d_speed = ev + gamma(2) * speed
+    low = speed - d_speed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        upper = (np.abs(cross) + d_cross) / low ** 3
+        lower = np.maximum(np.abs(cross) - d_cross, 0.0) / (speed + d_speed) ** 3
+        bound = np.maximum(upper - np.abs(k), np.abs(k) - lower) + gamma(6) * np.abs(k)
+    return k, np.where(low > 0, bound, np.inf)
+
+
+# Length
+
+def length(ctrl, tol=LENGTH_TOL, mode="stable", max_pieces=MAX_PIECES):
+    """Arc length and a bound on its error.
+
+    stable and compensated cut the curve until every piece's control polygon
+    is within its share of tol of the chord; the arc of a piece lies between
+    the two, so their gap bounds the error of Gravesen's estimate
+    (2 chord + (n - 1) polygon) / (n + 1). fast is the Gauss-Legendre table of
+    arclength.py with its refinement estimate. When tol would need more than
+    max_pieces pieces the bound is reported as reached, larger than tol.
+    """
+    _check_mode(mode)
+    ctrl = as_points(ctrl)
+    n = len(ctrl) - 1
+    if n < 1:
+        return 0.0, 0.0
+    if mode == "fast":
+        table = ArcLengthTable.from_quadrature(ctrl, tol)
+        return table.total, float(table.error)
+    left, right = piece_matrices(n, 2)
+    # Control point j of piece k is pieces[j, k], so a split is a plain matrix product
+    pieces = ctrl[:, None]
+    parts, gaps, slack = [], [], []
+    spent = 0.0
+    depth = 0
+    while True:
+        # Lengths do not depend on position, so every piece is moved to its own first point: the
+        # rounding of a split then scales with the piece, not with the scene coordinates
+        pieces = pieces - pieces[:1]
+        chord = np.hypot(pieces[-1, :, 0], pieces[-1, :, 1])
+        edges = pieces[1:] - pieces[:-1]
+        poly = np.sqrt(np.einsum("jkc,jkc->jk", edges, edges)).sum(axis=0)
+        gap = np.maximum(poly - chord, 0.0)
+        done = gap <= tol * 0.5 ** depth
+        if spent + gap.sum() <= tol or 2 * np.count_nonzero(~done) > max_pieces:
+            done[:] = True
+        parts.append((2 * chord[done] + (n - 1) * poly[done]) / (n + 1))
+        gaps.append(gap[done])
+        spent += gap[done].sum()
+        # Moving a control point by e changes the length by at most the difference curve's polygon, 3 n e;
+        # the move to the origin and the split together round the points by at most gamma_3n+2 of the
+        # extent, which the polygon length bounds since the piece starts at the origin
+        slack.append((3 * n * gamma(3 * n + 2) + gamma(n + 4)) * poly)
+        pieces = pieces[:, ~done]
+        if pieces.shape[1] == 0:
+            break
+        # Both halves of every piece in two products; the weights are convex, so the rounding
+        # stays within gamma_n+1 of the extent
+        flat = pieces.reshape(n + 1, -1)
+        pieces = np.concatenate(((left @ flat).reshape(pieces.shape), (right @ flat).reshape(pieces.shape)), axis=1)
+        depth += 1
+    parts = np.concatenate(parts)
+    if mode == "compensated":
+        total = math.fsum(parts.tolist())
+        sum_error = UNIT_ROUNDOFF * total
+    else:
+        total = float(parts.sum())
+        sum_error = gamma(max(1, math.ceil(math.log2(len(parts)))) + 1) * total
+    bound = math.fsum(np.concatenate(gaps).tolist()) + math.fsum(np.concatenate(slack).tolist())
+    return total, float(bound + sum_error)
@@ -0,0 +1,106 @@
+"""Lightweight timing spans for the render loop, with Chrome trace export.
+
+Spans are no-ops while the profiler is disabled: span() then returns a shared
+null context, so instrumented code pays one attribute check per call.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+MAX_EVENTS = 200_000
+WINDOW = 240
+
+_NULL = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class Profiler:
+    """Collects named spans and frame times; stats() summarises the recent window.
+
+    Spans may end on pool threads, so recording and reading go through a lock;
+    readers copy what they need under it and do the work outside.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.frame_ms = deque(maxlen=WINDOW)
+        self.frame_stamps = deque(maxlen=WINDOW)
+        self.section_ms = {}
+        self.samples = 0
+
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NULL
+
+    def frame(self):
+        return _Span(self, "frame") if self.enabled else _NULL
+
+    def record(self, name, start, end):
+        ms = (end - start) / 1e6
+        tid = threading.get_ident()
+        with self._lock:
+            if name == "frame":
+                self.frame_ms.append(ms)
+                self.frame_stamps.append(end)
+            else:
+                self.section_ms.setdefault(name, deque(maxlen=WINDOW)).append(ms)
+            self.events.append((name, start, end, tid))
+
+    def reset(self):
+        with self._lock:
+            self.events.clear()
+            self.frame_ms.clear()
+            self.frame_stamps.clear()
+            self.section_ms.clear()
+
+    def stats(self):
+        """fps, frame p50/p99 in ms and mean ms per section over the recent window."""
+        with self._lock:
+            frames = sorted(self.frame_ms)
+            stamps = list(self.frame_stamps)
+            section_ms = {name: list(d) for name, d in self.section_ms.items()}
+        fps = 0.0
+        if len(stamps) > 1:
+            span_s = (stamps[-1] - stamps[0]) / 1e9
+            fps = (len(stamps) - 1) / span_s if span_s > 0 else 0.0
+
+        def pct(q):
+            return frames[min(len(frames) - 1, int(q * len(frames)))] if frames else 0.0
+
+        sections = {name: sum(d) / len(d) for name, d in section_ms.items() if d}
+        return {"fps": fps, "p50": pct(0.50), "p99": pct(0.99), "samples": self.samples, "sections": sections}
+
+    def export_chrome_trace(self, path):
+        """Write the recorded spans as Chrome trace JSON (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        with self._lock:
+            recorded = list(self.events)
+        events = [
+            {"name": name, "ph": "X", "pid": pid, "tid": tid,
+             "ts": (start - self._origin) / 1e3, "dur": (end - start) / 1e3}
+            for name, start, end, tid in recorded
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+profiler = Profiler()
@@ -0,0 +1,407 @@
+"""Closest-point and intersection queries on Bezier segments by batched subdivision.
+
+Every query splits all surviving pieces of one depth together and prunes them
+with control-point bounding boxes, which contain each piece by the convex-hull
+property. Answers are polished with a few Newton steps on the exact curves.
+"""
+import math
+from operator import attrgetter
+
+import numpy as np
+
+from bezier_eval import as_points, evaluate, evaluate_derivative, hodograph
+from curvature import find_roots
+from flatten import flatness, split_batch
+
+QUERY_TOLERANCE = 1e-3
+MAX_DEPTH = 40
+MAX_PAIRS = 1 << 14
+NEWTON_STEPS = 8
+ROOT_SAMPLES_PER_DEGREE = 8
+
+_version = attrgetter("version")
+
+
+def _boxes(pieces):
+    """Bounding boxes (K, 4) as x0, y0, x1, y1 of K pieces of shape (K, n+1, 2)."""
+    return np.concatenate((pieces.min(axis=1), pieces.max(axis=1)), axis=1)
+
+
+def _box_distance(boxes, x, y):
+    dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0.0)
+    dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0.0)
+    return np.hypot(dx, dy)
+
+
+def subcurve(ctrl, t0, t1):
+    """Control points of the part of the curve between t0 and t1."""
+    ctrl = as_points(ctrl)
+    head = ctrl if t1 >= 1.0 else split_batch(ctrl[None], t1)[0][0]
+    if t0 <= 0.0:
+        return head.copy()
+    return split_batch(head[None], t0 / t1)[1][0]
+
+
+# Closest point
+
+def closest_point(ctrl, x, y, tol=QUERY_TOLERANCE):
+    """(t, point, distance) of the point on the curve nearest to (x, y)."""
+    ctrl = as_points(ctrl)
+    if len(ctrl) == 0:
+        return 0.0, np.zeros(2), math.inf
+    if len(ctrl) == 1:
+        return 0.0, ctrl[0].copy(), math.hypot(ctrl[0, 0] - x, ctrl[0, 1] - y)
+    p = np.array([x, y])
+    pieces = ctrl[None]
+    t0 = np.zeros(1)
+    width = 1.0
+    best_t = 0.0
+    best_d = math.inf
+    for _ in range(MAX_DEPTH):
+        # Piece end points lie on the curve and give upper bounds
+        ends = np.concatenate((pieces[:, 0], pieces[:, -1]))
+        d_ends = np.hypot(ends[:, 0] - x, ends[:, 1] - y)
+        i = int(np.argmin(d_ends))
+        if d_ends[i] < best_d:
+            best_d = float(d_ends[i])
+            best_t = float(t0[i % len(t0)] + (width if i >= len(t0) else 0.0))
+        keep = _box_distance(_boxes(pieces), x, y) <= best_d
+        pieces, t0 = pieces[keep], t0[keep]
+        # Flat pieces are replaced by their chords below
+        if len(pieces) == 0 or flatness(pieces).max() <= tol:
+            break
+        width *= 0.5
+        left, right = split_batch(pieces)
+        pieces = np.concatenate((left, right))
+        t0 = np.concatenate((t0, t0 + width))
+    # Project onto the chords of the surviving pieces, then polish with Newton
+    for piece, start in zip(pieces, t0):
+        a, d = piece[0], piece[-1] - piece[0]
+        dd = float(d @ d)
+        u = min(1.0, max(0.0, float((p - a) @ d) / dd)) if dd > 0 else 0.0
+        t = start + u * width
+        q = evaluate(ctrl, [t])[0]
+        dq = math.hypot(q[0] - x, q[1] - y)
+        if dq < best_d:
+            best_t, best_d = t, dq
+    t = _polish_closest(ctrl, p, best_t)
+    q = evaluate(ctrl, [t])[0]
+    d = math.hypot(q[0] - x, q[1] - y)
+    if d < best_d:
+        best_t, best_d = t, d
+    return best_t, evaluate(ctrl, [best_t])[0], best_d
+
+
+def _polish_closest(ctrl, p, t):
+    """Newton steps on (B(t) - p) . B'(t) = 0, clamped to [0, 1]."""
+    h = hodograph(ctrl)
+    hh = hodograph(h)
+    for _ in range(NEWTON_STEPS):
+        q = evaluate(ctrl, [t])[0] - p
+        d1 = evaluate(h, [t])[0]
+        d2 = evaluate(hh, [t])[0] if len(hh) else np.zeros(2)
+        f = q @ d1
+        df = d1 @ d1 + q @ d2
+        if df <= 0:
+            break
+        step = f / df
+        t = min(1.0, max(0.0, t - step))
+        if abs(step) < 1e-14:
+            break
+    return t
+
+
+# Intersections
+
+def _chord_hits(a, b):
+    """Parameters (u, v) in [0, 1] where the chords of piece pairs a[k] and b[k] cross, and their mask."""
+    p, r = a[:, 0], a[:, -1] - a[:, 0]
+    q, s = b[:, 0], b[:, -1] - b[:, 0]
+    den = r[:, 0] * s[:, 1] - r[:, 1] * s[:, 0]
+    qp = q - p
+    ok = np.abs(den) > 1e-300
+    safe = np.where(ok, den, 1.0)
+    u = (qp[:, 0] * s[:, 1] - qp[:, 1] * s[:, 0]) / safe
+    v = (qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0]) / safe
+    eps = 1e-9
+    hit = ok & (u >= -eps) & (u <= 1 + eps) & (v >= -eps) & (v <= 1 + eps)
+    return np.clip(u, 0.0, 1.0), np.clip(v, 0.0, 1.0), hit
+
+
+def _polish_intersection(a, b, s, t):
+    """Newton steps on A(s) - B(t) = 0 for arrays of starting parameters."""
+    for _ in range(NEWTON_STEPS):
+        f = evaluate(a, s) - evaluate(b, t)
+        da = evaluate_derivative(a, s)
+        db = -evaluate_derivative(b, t)
+        det = da[:, 0] * db[:, 1] - da[:, 1] * db[:, 0]
+        ok = np.abs(det) > 1e-12
+        safe = np.where(ok, det, 1.0)
+        ds = np.where(ok, (f[:, 0] * db[:, 1] - f[:, 1] * db[:, 0]) / safe, 0.0)
+        dt = np.where(ok, (da[:, 0] * f[:, 1] - da[:, 1] * f[:, 0]) / safe, 0.0)
+        s = np.clip(s - ds, 0.0, 1.0)
+        t = np.clip(t - dt, 0.0, 1.0)
+    return s, t
+
+
+def _dedupe(s, t, pts, tol):
+    """Drop hits closer than tol to an earlier one (curves crossing at piece boundaries are found twice)."""
+    order = np.argsort(s, kind="stable")
+    keep = []
+    for i in order:
+        if all(math.hypot(*(pts[i] - pts[j])) > tol or abs(t[i] - t[j]) > tol for j in keep):
+            keep.append(i)
+    keep = np.array(keep, dtype=int)
+    return s[keep], t[keep], pts[keep]
+
+
+def intersect(a, b, tol=QUERY_TOLERANCE):
+    """Crossings of curves a and b as (s, t, points), with A(s) = B(t), sorted by s.
+
+    Piece pairs whose boxes overlap are split four ways per depth; once both
+    pieces of a pair are flat within tol their chords are intersected. Pairs
+    are capped at MAX_PAIRS, so overlapping (coincident) curves return a sample
+    of the shared stretch rather than running away.
+    """
+    a = as_points(a)
+    b = as_points(b)
+    empty = np.zeros(0), np.zeros(0), np.zeros((0, 2))
+    if len(a) < 2 or len(b) < 2:
+        return empty
+    pa, pb = a[None], b[None]
+    sa, sb = np.zeros(1), np.zeros(1)
+    width = 1.0
+    found_s, found_t = [], []
+    for depth in range(MAX_DEPTH):
+        ba, bb = _boxes(pa), _boxes(pb)
+        overlap = ((ba[:, 0] <= bb[:, 2] + tol) & (bb[:, 0] <= ba[:, 2] + tol)
+                   & (ba[:, 1] <= bb[:, 3] + tol) & (bb[:, 1] <= ba[:, 3] + tol))
+        pa, pb, sa, sb = pa[overlap], pb[overlap], sa[overlap], sb[overlap]
+        if len(pa) == 0:
+            break
+        flat = (flatness(pa) <= tol) & (flatness(pb) <= tol)
+        last = depth == MAX_DEPTH - 1 or 4 * len(pa) > MAX_PAIRS
+        if last:
+            flat[:] = True
+        if flat.any():
+            u, v, hit = _chord_hits(pa[flat], pb[flat])
+            found_s.append((sa[flat] + u * width)[hit])
+            found_t.append((sb[flat] + v * width)[hit])
+        if last:
+            break
+        pa, pb, sa, sb = pa[~flat], pb[~flat], sa[~flat], sb[~flat]
+        if len(pa) == 0:
+            break
+        width *= 0.5
+        la, ra = split_batch(pa)
+        lb, rb = split_batch(pb)
+        pa = np.concatenate((la, la, ra, ra))
+        pb = np.concatenate((lb, rb, lb, rb))
+        sa = np.concatenate((sa, sa, sa + width, sa + width))
+        sb = np.concatenate((sb, sb + width, sb, sb + width))
+    if not found_s:
+        return empty
+    s, t = _polish_intersection(a, b, np.concatenate(found_s), np.concatenate(found_t))
+    pts = evaluate(a, s)
+    # Newton can wander off a tangential touch; keep only real hits
+    close = np.hypot(*(pts - evaluate(b, t)).T) <= max(tol, 1e-9) * 10
+    return _dedupe(s[close], t[close], pts[close], tol)
+
+
+def monotone_breaks(ctrl):
+    """Parameters in (0, 1) where x'(t) or y'(t) changes sign; between them the curve is x- and y-monotone."""
+    h = hodograph(ctrl)
+    if len(h) < 2:
+        return np.zeros(0)
+    samples = max(64, ROOT_SAMPLES_PER_DEGREE * 2 * len(h))
+    roots = np.concatenate([find_roots(lambda ts, k=k: evaluate(h, ts)[:, k], samples) for k in (0, 1)])
+    return np.unique(roots[(roots > 1e-9) & (roots < 1 - 1e-9)])
+
+
+def monotone_in_some_direction(ctrl):
+    """Whether the curve moves forward along one fixed direction for all t, and so cannot cross itself.
+
+    B'(t) is a convex combination of the hodograph control vectors; if those
+    all lie in one open half-plane, B'(t) . u > 0 for its inner normal u.
+    """
+    h = hodograph(as_points(ctrl))
+    h = h[np.hypot(h[:, 0], h[:, 1]) > 1e-12]
+    if len(h) == 0:
+        return True
+    angles = np.sort(np.arctan2(h[:, 1], h[:, 0]))
+    gaps = np.diff(np.concatenate((angles, [angles[0] + 2 * math.pi])))
+    return bool(gaps.max() > math.pi + 1e-12)
+
+
+def self_intersections(ctrl, tol=QUERY_TOLERANCE):
+    """Self-crossings as (t1, t2, points) with t1 < t2.
+
+    A piece that is monotone in both x and y cannot cross itself, so the curve
+    is cut at the extrema of x and y and the pieces are intersected pairwise.
+    Curves whose hodograph polygon fits in a half-plane are skipped outright.
+    """
+    ctrl = as_points(ctrl)
+    empty = np.zeros(0), np.zeros(0), np.zeros((0, 2))
+    if len(ctrl) < 4 or monotone_in_some_direction(ctrl):
+        return empty
+    cuts = np.concatenate(([0.0], monotone_breaks(ctrl), [1.0]))
+    pieces = [subcurve(ctrl, cuts[i], cuts[i + 1]) for i in range(len(cuts) - 1)]
+    t1, t2, pts = [], [], []
+    for i in range(len(pieces)):
+        for j in range(i + 1, len(pieces)):
+            s, t, p = intersect(pieces[i], pieces[j], tol)
+            s = cuts[i] + s * (cuts[i + 1] - cuts[i])
+            t = cuts[j] + t * (cuts[j + 1] - cuts[j])
+            # Neighbouring pieces always meet at their shared cut
+            real = t - s > tol
+            t1.append(s[real])
+            t2.append(t[real])
+            pts.append(p[real])
+    if not t1:
+        return empty
+    return _dedupe(np.concatenate(t1), np.concatenate(t2), np.concatenate(pts), tol)
+
+
+class QueryCache:
+    """Per-segment query results, reused while the segments' versions are unchanged.
+
+    Entries hold the segment objects themselves, so a recycled id() never
+    returns another segment's answer.
+    """
+    def __init__(self, tol=QUERY_TOLERANCE):
+        self.tol = tol
+        self._boxes = {}
+        self._self = {}
+        self._pairs = {}
+        # (segment ids, versions, stacked boxes, segments) of the last list passed to boxes(); holding
+        # the segments keeps their ids from being recycled
+        self._stack = None
+        self.hits = 0
+        self.misses = 0
+
+    def box(self, seg):
+        key = id(seg)
+        cached = self._boxes.get(key)
+        if cached is not None and cached[0] is seg and cached[1] == seg.version:
+            return cached[2]
+        pts = seg.points
+        box = np.concatenate((pts.min(axis=0), pts.max(axis=0))) if len(pts) else None
+        self._boxes[key] = (seg, seg.version, box)
+        return box
+
+    def boxes(self, segments):
+        """Boxes of segments stacked as (K, 4), NaN for segments with fewer than two points.
+
+        Kept between calls: for the same list only the rows whose version moved are redone.
+        """
+        ids = np.fromiter(map(id, segments), np.uintp, len(segments))
+        versions = np.fromiter(map(_version, segments), np.int64, len(segments))
+        stack = self._stack
+        if stack is not None and np.array_equal(stack[0], ids):
+            rows = np.nonzero(stack[1] != versions)[0]
+            boxes = stack[2]
+        else:
+            rows = range(len(segments))
+            boxes = np.full((len(segments), 4), np.nan)
+        for i in rows:
+            seg = segments[i]
+            if len(seg) >= 2:
+                boxes[i] = self.box(seg)
+            else:
+                boxes[i] = np.nan
+        self._stack = (ids, versions, boxes, list(segments))
+        return boxes
+
+    def closest(self, segments, x, y, max_dist=math.inf, accept=None):
+        """(segment, t, point, distance) on the curve nearest to (x, y) within max_dist, or None.
+
+        Box distances of all segments come from one vectorized call; segments
+        are visited by that distance, so far ones are never subdivided.
+        accept(seg) filters the candidates.
+        """
+        d = _box_distance(self.boxes(segments), x, y)
+        near = np.nonzero(d <= max_dist)[0]
+        best = None
+        for i in near[np.argsort(d[near], kind="stable")].tolist():
+            if d[i] > max_dist:
+                break
+            seg = segments[i]
+            if accept is not None and not accept(seg):
+                continue
+            t, p, dist = closest_point(seg.points, x, y, self.tol)
+            if dist <= max_dist:
+                best, max_dist = (seg, t, p, dist), dist
+        return best
+
+    def self_intersections(self, seg):
+        key = id(seg)
+        cached = self._self.get(key)
+        if cached is not None and cached[0] is seg and cached[1] == seg.version:
+            self.hits += 1
+            return cached[2]
+        self.misses += 1
+        result = self_intersections(seg.points, self.tol)
+        self._self[key] = (seg, seg.version, result)
+        return result
+
+    def intersections(self, a, b):
+        key = (id(a), id(b))
+        cached = self._pairs.get(key)
+        if (cached is not None and cached[0] is a and cached[1] is b
+                and cached[2] == a.version and cached[3] == b.version):
+            self.hits += 1
+            return cached[4]
+        self.misses += 1
+        result = intersect(a.points, b.points, self.tol)
+        self._pairs[key] = (a, b, a.version, b.version, result)
+        return result
+
+    def candidate_pairs(self, segments):
+        """Index pairs (i, j), i < j, whose boxes overlap, by a sweep over the sorted x ranges."""
+        live = [(i, self.box(seg)) for i, seg in enumerate(segments) if len(seg) >= 2]
+        if len(live) < 2:
+            return []
+        idx = np.array([i for i, _ in live])
+        boxes = np.array([box for _, box in live])
+        order = np.argsort(boxes[:, 0], kind="stable")
+        idx, boxes = idx[order], boxes[order]
+        # Boxes starting before box k ends are the only x-overlap candidates
+        ends = np.searchsorted(boxes[:, 0], boxes[:, 2], side="right")
+        pairs = []
+        for k in range(len(idx)):
+            others = np.arange(k + 1, ends[k])
+            if len(others) == 0:
+                continue
+            ob = boxes[others]
+            hit = (ob[:, 1] <= boxes[k, 3]) & (ob[:, 3] >= boxes[k, 1])
+            for o in others[hit]:
+                i, j = idx[k], idx[o]
+                pairs.append((min(i, j), max(i, j)))
+        return pairs
+
+    def pair_intersections(self, segments):
+        """Points (M, 2) of all crossings between different segments."""
+        found = [self.intersections(segments[i], segments[j])[2] for i, j in self.candidate_pairs(segments)]
+        found = [f for f in found if len(f)]
+        return np.concatenate(found) if found else np.zeros((0, 2))
+
+    def scene_intersections(self, segments):
+        """Points (M, 2) of all crossings between and within segments."""
+        found = [self.self_intersections(seg)[2] for seg in segments if len(seg) >= 4]
+        found.append(self.pair_intersections(segments))
+        found = [f for f in found if len(f)]
+        return np.concatenate(found) if found else np.zeros((0, 2))
+
+    def prune(self, segments):
+        live = {id(seg) for seg in segments}
+        for cache in (self._boxes, self._self):
+            for key in [k for k in cache if k not in live]:
+                del cache[key]
+        for key in [k for k in self._pairs if k[0] not in live or k[1] not in live]:
+            del self._pairs[key]
+
+    def clear(self):
+        self._boxes.clear()
+        self._self.clear()
+        self._pairs.clear()
+        self._stack = None
@@ -0,0 +1,198 @@
+"""Saving and loading scenes as JSON or as a compact memory-mapped binary file.
+
+Binary layout (little endian, every field 8-byte aligned):
+
+    magic     4 bytes  b"BZSC"
+    version   u32
+    segments  u64      number of segments S
+    points    u64      total number of control points P
+    offsets   u64[S+1] start of each segment in the point array
+    coords    f64[P*2] packed x, y pairs
+    flags     u8[S]    per segment: bit 0 hidden, bit 1 locked (version 2 on)
+
+Loading maps the file and hands out read-only views into it; a segment only
+gets its own buffer when it is first edited. Files without flags load with
+every segment visible and unlocked.
+"""
+import json
+import mmap
+import os
+import tempfile
+
+import numpy as np
+
+from segment_model import Segment, make_segments
+
+MAGIC = b"BZSC"
+BINARY_VERSION = 2
+FLAG_HIDDEN = 1
+FLAG_LOCKED = 2
+HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("segments", "<u8"), ("points", "<u8")])
+BINARY_EXTENSIONS = (".bzs",)
+
+
+def _apply_flags(segments, visible, locked):
+    for seg, v, lk in zip(segments, visible, locked):
+        seg.visible = bool(v)
+        seg.locked = bool(lk)
+    return segments
+
+
+def save_json(path, segments):
+    data = {"version": 2, "segments": [np.asarray(seg).tolist() for seg in segments],
+            "visible": [getattr(seg, "visible", True) for seg in segments],
+            "locked": [getattr(seg, "locked", False) for seg in segments]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+def _json_points(path, i, points):
+    """(n, 2) array of segment i, or ValueError if the JSON is not a list of [x, y] pairs."""
+    try:
+        pts = np.asarray(points, dtype=np.float64)
+    except (TypeError, ValueError):
+        pts = None
+    if pts is None or not (pts.ndim == 2 and pts.shape[1] == 2 or pts.size == 0):
+        raise ValueError(f"{path}: segment {i + 1} is not a list of [x, y] pairs")
+    return pts.reshape(-1, 2)
+
+
+def _json_flags(path, data, key, n, default):
+    flags = data.get(key, [default] * n)
+    if not isinstance(flags, list) or len(flags) != n or not all(isinstance(f, bool) for f in flags):
+        raise ValueError(f'{path}: "{key}" must be a list of {n} true/false values')
+    return flags
+
+
+def load_json(path):
+    """Segments from a JSON scene: {"segments": [[[x, y], ...], ...]} or a bare list of segments.
+
+    The optional "visible" and "locked" lists default to visible and unlocked.
+    Input of any other shape raises ValueError.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    segments = data.get("segments", []) if isinstance(data, dict) else data
+    if not isinstance(segments, list):
+        raise ValueError(f"{path}: not a scene file (expected a list of segments)")
+    segments = make_segments([_json_points(path, i, seg) for i, seg in enumerate(segments)])
+    if not isinstance(data, dict):
+        return segments
+    n = len(segments)
+    return _apply_flags(segments, _json_flags(path, data, "visible", n, True), _json_flags(path, data, "locked", n, False))
+
+
+def _file_mode(path):
+    """Permission bits for rewriting path: its own, or the umask default for a new file."""
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def save_binary(path, segments, release=None):
+    """Write segments to path through a temporary file that replaces it.
+
+    Windows refuses to replace a file that is still mapped, as path is when
+    the scene was loaded from it. The segments are then copied out of the
+    mapping, release() lets other holders of mapped arrays do the same, and
+    the swap is retried once.
+    """
+    arrays = [np.asarray(seg, dtype="<f8").reshape(-1, 2) for seg in segments]
+    offsets = np.zeros(len(arrays) + 1, dtype="<u8")
+    np.cumsum([len(a) for a in arrays], out=offsets[1:])
+    header = np.array([(MAGIC, BINARY_VERSION, len(arrays), int(offsets[-1]))], dtype=HEADER)
+    flags = np.array([(0 if getattr(seg, "visible", True) else FLAG_HIDDEN)
+                      | (FLAG_LOCKED if getattr(seg, "locked", False) else 0) for seg in segments], dtype="u1")
+    # The arrays may be views into a mapping of path itself, so the file is written beside it and
+    # swapped in: the old file stays intact for as long as anything still maps it
+    fd, tmp = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        # Closed before anything else can fail, so tmp can be unlinked on Windows too
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.tobytes())
+            f.write(offsets.tobytes())
+            for a in arrays:
+                f.write(np.ascontiguousarray(a).tobytes())
+            f.write(flags.tobytes())
+        del arrays
+        # os.fchmod only exists on Windows from Python 3.13
+        os.chmod(tmp, _file_mode(path))
+        try:
+            os.replace(tmp, path)
+        except PermissionError:
+            for seg in segments:
+                if isinstance(seg, Segment):
+                    seg.detach()
+            if release is not None:
+                release()
+            os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class BinaryScene:
+    """Read-only, memory-mapped view of a binary scene; scene[i] is an (n, 2) array view."""
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.itemsize:
+                raise ValueError(f"{path}: not a binary scene file")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._map)
+        header = np.frombuffer(buf, HEADER, count=1)[0]
+        if header["magic"] != MAGIC:
+            raise ValueError(f"{path}: not a binary scene file")
+        version = int(header["version"])
+        if not 1 <= version <= BINARY_VERSION:
+            raise ValueError(f"{path}: unsupported scene version {version}")
+        n_seg, n_pts = int(header["segments"]), int(header["points"])
+        start = HEADER.itemsize
+        end = start + 8 * (n_seg + 1) + 16 * n_pts
+        if size < end + (n_seg if version >= 2 else 0):
+            raise ValueError(f"{path}: truncated scene file")
+        self.offsets = np.frombuffer(buf, "<u8", count=n_seg + 1, offset=start).astype(np.intp)
+        self.coords = np.frombuffer(buf, "<f8", count=2 * n_pts, offset=start + 8 * (n_seg + 1)).reshape(-1, 2)
+        # Copied: a few bytes, and nothing then keeps the mapping open but the segments
+        self.flags = (np.frombuffer(buf, "u1", count=n_seg, offset=end).copy() if version >= 2
+                      else np.zeros(n_seg, dtype="u1"))
+        if len(self.offsets) and (self.offsets[0] != 0 or self.offsets[-1] != n_pts or np.any(np.diff(self.offsets) < 0)):
+            raise ValueError(f"{path}: corrupt offset table")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def segments(self):
+        """Segments backed by views into the mapping (copied on first edit), with their saved flags."""
+        segments = [Segment.wrap(self[i]) for i in range(len(self))]
+        return _apply_flags(segments, (self.flags & FLAG_HIDDEN) == 0, (self.flags & FLAG_LOCKED) != 0)
+
+
+def load_binary(path):
+    return BinaryScene(path).segments()
+
+
+def is_binary(path):
+    return os.path.splitext(str(path))[1].lower() in BINARY_EXTENSIONS
+
+
+def save_scene(path, segments, release=None):
+    """Save as binary or JSON by extension; release is passed on to save_binary."""
+    if is_binary(path):
+        save_binary(path, segments, release)
+    else:
+        save_json(path, segments)
+
+
+def load_scene(path):
+    return load_binary(path) if is_binary(path) else load_json(path)
@@ -0,0 +1,118 @@
+"""Table model over the scene's segments for the sidebar list.
+
+The view asks only for the rows on screen, so per-segment stats are requested
+on demand from the geometry cache and stay cheap with thousands of segments.
+Stats still being measured on the pool show a placeholder until they land.
+"""
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QItemSelection, QItemSelectionModel
+
+COLUMNS = ("ID", "Visible", "Locked", "Degree", "Length", "Max curvature")
+COL_ID, COL_VISIBLE, COL_LOCKED, COL_DEGREE, COL_LENGTH, COL_CURVATURE = range(len(COLUMNS))
+PENDING = "…"
+_ROW_FLAGS = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+_CHECK_FLAGS = _ROW_FLAGS | Qt.ItemFlag.ItemIsUserCheckable
+
+
+class SegmentListModel(QAbstractTableModel):
+    """One row per segment of app.segments; toggling the flag columns calls on_flags_changed()."""
+    def __init__(self, app, on_flags_changed=None, parent=None):
+        super().__init__(parent)
+        self.app = app
+        self.on_flags_changed = on_flags_changed
+        self._ids = ()
+        self._rows = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.app.segments)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        return _CHECK_FLAGS if index.column() in (COL_VISIBLE, COL_LOCKED) else _ROW_FLAGS
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.app.segments):
+            return None
+        seg = self.app.segments[index.row()]
+        col = index.column()
+        if role == Qt.ItemDataRole.CheckStateRole:
+            if col == COL_VISIBLE:
+                return Qt.CheckState.Checked if seg.visible else Qt.CheckState.Unchecked
+            if col == COL_LOCKED:
+                return Qt.CheckState.Checked if seg.locked else Qt.CheckState.Unchecked
+            return None
+        if role == Qt.ItemDataRole.TextAlignmentRole and col >= COL_DEGREE:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if col == COL_ID:
+            return seg.uid
+        if col == COL_DEGREE:
+            return len(seg) - 1 if len(seg) else "—"
+        if col == COL_LENGTH or col == COL_CURVATURE:
+            if len(seg) < (2 if col == COL_LENGTH else 3):
+                return "—"
+            analysis = self.app.geometry.analysis(seg, wait=False, curvature=col == COL_CURVATURE)
+            if analysis is None:
+                return PENDING
+            if col == COL_LENGTH:
+                return f"{analysis.length:.1f}"
+            return f"{analysis.curvature.max_curvature:.4g}"
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.CheckStateRole or index.column() not in (COL_VISIBLE, COL_LOCKED):
+            return False
+        seg = self.app.segments[index.row()]
+        on = Qt.CheckState(value) == Qt.CheckState.Checked
+        if index.column() == COL_VISIBLE:
+            seg.visible = on
+        else:
+            seg.locked = on
+        self.dataChanged.emit(index, index, [role])
+        if self.on_flags_changed is not None:
+            self.on_flags_changed()
+        return True
+
+    def sync(self):
+        """Reset when the segment list changed; otherwise mark the flag and stats columns stale.
+
+        dataChanged over all rows is cheap: the view re-reads only the rows it shows.
+        """
+        ids = tuple(map(id, self.app.segments))
+        if ids != self._ids:
+            self.beginResetModel()
+            self._ids = ids
+            self._rows = {key: row for row, key in enumerate(ids)}
+            self.endResetModel()
+            return True
+        if ids:
+            self.dataChanged.emit(self.index(0, COL_VISIBLE), self.index(len(ids) - 1, COL_CURVATURE))
+        return False
+
+    def segment_measured(self, seg):
+        """Refresh the stats of seg's row once its analysis has landed."""
+        row = self._rows.get(id(seg))
+        if row is not None and row < len(self.app.segments) and self.app.segments[row] is seg:
+            self.dataChanged.emit(self.index(row, COL_LENGTH), self.index(row, COL_CURVATURE))
+
+    def select_uids(self, selection_model, uids):
+        """Select the rows of the given uids, as one range per run of consecutive rows."""
+        selection = QItemSelection()
+        start = None
+        last = len(self.app.segments) - 1
+        for row, seg in enumerate(self.app.segments):
+            if seg.uid in uids:
+                if start is None:
+                    start = row
+                if row < last and self.app.segments[row + 1].uid in uids:
+                    continue
+                selection.select(self.index(start, 0), self.index(row, len(COLUMNS) - 1))
+                start = None
+        selection_model.select(selection, QItemSelectionModel.SelectionFlag.ClearAndSelect)
@@ -0,0 +1,156 @@
+"""Array-backed storage for the control points of one Bezier segment."""
+import itertools
+
+import numpy as np
+
+MIN_CAPACITY = 8
+
+_uids = itertools.count(1)
+
+
+class Segment:
+    """Control points in a contiguous (capacity, 2) float64 buffer; `points` is a zero-copy view.
+
+    `uid` is unique per process and survives edits; `visible` and `locked`
+    are display flags and do not change `version`.
+    """
+    __slots__ = ("_buf", "_n", "version", "uid", "visible", "locked")
+
+    def __init__(self, points=()):
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self._n = len(pts)
+        self._buf = np.empty((max(MIN_CAPACITY, 2 * self._n), 2))
+        self._buf[:self._n] = pts
+        self.version = 0
+        self.uid = next(_uids)
+        self.visible = True
+        self.locked = False
+
+    @classmethod
+    def wrap(cls, points):
+        """Segment over an existing (n, 2) float64 array without copying; read-only buffers are copied on first edit."""
+        seg = cls.__new__(cls)
+        seg._buf = points
+        seg._n = len(points)
+        seg.version = 0
+        seg.uid = next(_uids)
+        seg.visible = True
+        seg.locked = False
+        return seg
+
+    @property
+    def points(self):
+        return self._buf[:self._n]
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is not None and np.dtype(dtype) != self._buf.dtype:
+            return self.points.astype(dtype)
+        return self.points.copy() if copy else self.points
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        return self.points[i]
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def __repr__(self):
+        return f"Segment({self.points.tolist()!r})"
+
+    def _touch(self):
+        self.version += 1
+
+    def _make_writable(self):
+        if not self._buf.flags.writeable:
+            buf = np.empty((max(MIN_CAPACITY, 2 * self._n), 2))
+            buf[:self._n] = self._buf[:self._n]
+            self._buf = buf
+
+    def detach(self):
+        """Copy the points into an own buffer if they view someone else's read-only array, such as a scene mapping."""
+        if not self._buf.flags.writeable and not self._buf.flags.owndata:
+            self._make_writable()
+
+    def set_point(self, i, x, y):
+        self._make_writable()
+        self.points[i] = (x, y)
+        self._touch()
+
+    def insert(self, i, x, y):
+        n = self._n
+        if i < 0:
+            i += n
+        i = max(0, min(i, n))
+        self._make_writable()
+        if n == len(self._buf):
+            buf = np.empty((2 * len(self._buf), 2))
+            buf[:n] = self._buf[:n]
+            self._buf = buf
+        self._buf[i + 1:n + 1] = self._buf[i:n]
+        self._buf[i] = (x, y)
+        self._n = n + 1
+        self._touch()
+
+    def append(self, x, y):
+        self.insert(self._n, x, y)
+
+    def pop(self, i=-1):
+        n = self._n
+        if n == 0:
+            raise IndexError("pop from empty segment")
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("segment index out of range")
+        self._make_writable()
+        p = self._buf[i].copy()
+        self._buf[i:n - 1] = self._buf[i + 1:n]
+        self._n = n - 1
+        self._touch()
+        return p
+
+    def translate(self, dx, dy):
+        self._make_writable()
+        self._buf[:self._n] += (dx, dy)
+        self._touch()
+
+    def copy(self):
+        return self.derive(self.points)
+
+    def derive(self, points, keep_uid=False):
+        """New segment over points with this one's flags; keep_uid when it replaces this one one-to-one."""
+        seg = Segment(points)
+        seg.visible = self.visible
+        seg.locked = self.locked
+        if keep_uid:
+            seg.uid = self.uid
+        return seg
+
+
+def make_segments(data):
+    """Build segments from nested sequences of (x, y) pairs."""
+    return [Segment(seg) for seg in data]
+
+
+def translate_segments(segments, dx, dy):
+    """Move every segment by (dx, dy) with one addition over all their points.
+
+    The moved points are one concatenated array and each segment takes its
+    slice of it as buffer, so nothing is copied back per segment.
+    """
+    segs = [seg for seg in segments if len(seg)]
+    if not segs:
+        return
+    moved = np.concatenate([seg.points for seg in segs]) + (dx, dy)
+    ends = np.cumsum([seg._n for seg in segs])
+    for seg, end in zip(segs, ends.tolist()):
+        seg._buf = moved[end - seg._n:end]
+        seg._touch()
+
+
+def without(segments, uids):
+    """The segments whose uid is not in uids, in order."""
+    uids = set(uids)
+    return [seg for seg in segments if seg.uid not in uids]
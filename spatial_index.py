@@ -0,0 +1,223 @@
+"""Uniform-grid index over control points and control-polygon edges for hit-testing."""
+import math
+from collections import defaultdict
+
+import numpy as np
+
+DEFAULT_CELL = 32.0
+
+
+def _point_segment_distance(px, py, ax, ay, bx, by):
+    vx, vy = bx - ax, by - ay
+    c2 = vx * vx + vy * vy
+    u = 0.0 if c2 <= 0 else min(1.0, max(0.0, ((px - ax) * vx + (py - ay) * vy) / c2))
+    return math.hypot(px - (ax + u * vx), py - (ay + u * vy))
+
+
+class SpatialIndex:
+    """Grid buckets of (segment, index) entries for points and edges (index -> index + 1).
+
+    Edits made through move_point / insert_point / pop_point update only the
+    affected entries; any other mutation is picked up by sync() through the
+    segment version counter.
+    """
+    def __init__(self, cell=DEFAULT_CELL):
+        self.cell = cell
+        self._points = defaultdict(set)
+        self._edges = defaultdict(set)
+        self._point_keys = {}
+        self._edge_keys = {}
+        self._versions = {}
+
+    # Cell bookkeeping
+
+    def _key(self, x, y):
+        return int(math.floor(x / self.cell)), int(math.floor(y / self.cell))
+
+    def _box_keys(self, x0, y0, x1, y1):
+        cx0, cy0 = self._key(min(x0, x1), min(y0, y1))
+        cx1, cy1 = self._key(max(x0, x1), max(y0, y1))
+        return [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+
+    @staticmethod
+    def _buckets(grid, cx0, cy0, cx1, cy1):
+        """Buckets of grid in the cell range, walking the cells or the occupied buckets, whichever are fewer."""
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(grid):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    bucket = grid.get((cx, cy))
+                    if bucket:
+                        yield bucket
+        else:
+            for (cx, cy), bucket in grid.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield bucket
+
+    @staticmethod
+    def _discard(grid, keys, entry):
+        for key in keys:
+            bucket = grid.get(key)
+            if bucket is not None:
+                bucket.discard(entry)
+                if not bucket:
+                    del grid[key]
+
+    def _index_from(self, seg, start):
+        """(Re)insert the point entries from start and edge entries from start - 1 onwards."""
+        pts = seg.points
+        point_keys = self._point_keys[seg]
+        edge_keys = self._edge_keys[seg]
+        for i in range(start, len(pts)):
+            key = self._key(pts[i, 0], pts[i, 1])
+            point_keys.append(key)
+            self._points[key].add((seg, i))
+        for i in range(max(0, start - 1), len(pts) - 1):
+            keys = self._box_keys(pts[i, 0], pts[i, 1], pts[i + 1, 0], pts[i + 1, 1])
+            edge_keys.append(keys)
+            for key in keys:
+                self._edges[key].add((seg, i))
+        self._versions[seg] = seg.version
+
+    def _unindex_from(self, seg, start):
+        point_keys = self._point_keys[seg]
+        edge_keys = self._edge_keys[seg]
+        for i in range(start, len(point_keys)):
+            self._discard(self._points, (point_keys[i],), (seg, i))
+        for i in range(max(0, start - 1), len(edge_keys)):
+            self._discard(self._edges, edge_keys[i], (seg, i))
+        del point_keys[start:]
+        del edge_keys[max(0, start - 1):]
+
+    def _drop(self, seg):
+        self._unindex_from(seg, 0)
+        del self._point_keys[seg], self._edge_keys[seg], self._versions[seg]
+
+    def sync(self, segments):
+        """Bring the index in line with segments: drop removed ones, reindex changed ones."""
+        live = set(segments)
+        for seg in [s for s in self._versions if s not in live]:
+            self._drop(seg)
+        for seg in segments:
+            version = self._versions.get(seg)
+            if version is None:
+                self._point_keys[seg] = []
+                self._edge_keys[seg] = []
+                self._index_from(seg, 0)
+            elif version != seg.version:
+                self._unindex_from(seg, 0)
+                self._index_from(seg, 0)
+
+    def clear(self):
+        for d in (self._points, self._edges, self._point_keys, self._edge_keys, self._versions):
+            d.clear()
+
+    # Incremental edits
+
+    def move_point(self, seg, i, x, y):
+        first, last = max(0, i - 1), min(i, len(seg) - 2)
+        self._discard(self._points, (self._point_keys[seg][i],), (seg, i))
+        for e in range(first, last + 1):
+            self._discard(self._edges, self._edge_keys[seg][e], (seg, e))
+        seg.set_point(i, x, y)
+        # Read only now: a read-only segment gets a new buffer on its first edit
+        pts = seg.points
+        key = self._key(x, y)
+        self._point_keys[seg][i] = key
+        self._points[key].add((seg, i))
+        for e in range(first, last + 1):
+            keys = self._box_keys(pts[e, 0], pts[e, 1], pts[e + 1, 0], pts[e + 1, 1])
+            self._edge_keys[seg][e] = keys
+            for k in keys:
+                self._edges[k].add((seg, e))
+        self._versions[seg] = seg.version
+
+    def insert_point(self, seg, i, x, y):
+        self._unindex_from(seg, i)
+        seg.insert(i, x, y)
+        self._index_from(seg, i)
+
+    def pop_point(self, seg, i):
+        self._unindex_from(seg, i)
+        p = seg.pop(i)
+        self._index_from(seg, i)
+        return p
+
+    # Queries
+
+    def nearest_point(self, x, y, radius, accept=None):
+        """Closest indexed (segment, index) within radius, or None; accept(seg) filters segments."""
+        best, best_d = None, radius
+        for key in self._box_keys(x - radius, y - radius, x + radius, y + radius):
+            for seg, i in self._points.get(key, ()):
+                if accept is not None and not accept(seg):
+                    continue
+                p = seg.points[i]
+                d = math.hypot(p[0] - x, p[1] - y)
+                if d <= best_d:
+                    best, best_d = (seg, i), d
+        return best
+
+    def _bounds(self):
+        keys = list(self._points) + list(self._edges)
+        if not keys:
+            return None
+        cx = [k[0] for k in keys]
+        cy = [k[1] for k in keys]
+        return min(cx), min(cy), max(cx), max(cy)
+
+    def nearest_polygon(self, x, y, accept=None):
+        """Segment whose control polygon (or lone point) is closest to (x, y), or None; accept(seg) filters segments.
+
+        The search box doubles until a candidate lies inside it or it covers the
+        whole indexed area, so typically only a few cells are visited. Past the
+        first round the box starts at the indexed area and is clipped to it, so
+        a click far outside the scene costs no more than a scan of the buckets.
+        """
+        bounds = None
+        radius = self.cell
+        while True:
+            best, best_d = None, float("inf")
+            seen = set()
+            cx0, cy0 = self._key(x - radius, y - radius)
+            cx1, cy1 = self._key(x + radius, y + radius)
+            if bounds is not None:
+                cx0, cy0 = max(cx0, bounds[0]), max(cy0, bounds[1])
+                cx1, cy1 = min(cx1, bounds[2]), min(cy1, bounds[3])
+            for bucket in self._buckets(self._edges, cx0, cy0, cx1, cy1):
+                for entry in bucket:
+                    if entry in seen:
+                        continue
+                    seen.add(entry)
+                    seg, i = entry
+                    if accept is not None and not accept(seg):
+                        continue
+                    a, b = seg.points[i], seg.points[i + 1]
+                    d = _point_segment_distance(x, y, a[0], a[1], b[0], b[1])
+                    if d < best_d:
+                        best, best_d = seg, d
+            for bucket in self._buckets(self._points, cx0, cy0, cx1, cy1):
+                for seg, i in bucket:
+                    if len(seg) == 1 and (accept is None or accept(seg)):
+                        p = seg.points[0]
+                        d = math.hypot(p[0] - x, p[1] - y)
+                        if d < best_d:
+                            best, best_d = seg, d
+            if best is not None and best_d <= radius:
+                return best
+            if bounds is None:
+                bounds = self._bounds()
+                if bounds is None:
+                    return None
+                # Nothing indexed is nearer than the indexed area itself
+                gx = max(bounds[0] * self.cell - x, 0.0, x - (bounds[2] + 1) * self.cell)
+                gy = max(bounds[1] * self.cell - y, 0.0, y - (bounds[3] + 1) * self.cell)
+                radius = max(radius, math.hypot(gx, gy))
+            elif cx0 <= bounds[0] and cy0 <= bounds[1] and cx1 >= bounds[2] and cy1 >= bounds[3]:
+                return best
+            radius *= 2
+
+
+def nearest_index(seg, x, y):
+    """Index of the control point of seg closest to (x, y)."""
+    pts = seg.points
+    return int(np.argmin(np.hypot(pts[:, 0] - x, pts[:, 1] - y)))
@@ -0,0 +1,47 @@
+"""The Horner evaluators agree with plain de Casteljau for degrees 1-50."""
+import numpy as np
+import pytest
+
+from bezier_eval import evaluate, evaluate_derivative, horner_derivative, horner_point
+
+DEGREES = (1, 2, 3, 5, 10, 20, 30, 40, 50)
+TS = np.array([0.0, 1e-9, 1e-3, 0.1, 0.25, 1 / 3, 0.5, 0.7, 0.9, 1 - 1e-3, 1 - 1e-9, 1.0])
+RTOL = 1e-9
+
+
+def control_points(degree, seed=11):
+    return np.random.default_rng(seed + degree).uniform((0, 0), (800, 500), size=(degree + 1, 2))
+
+
+def de_casteljau(ctrl, t):
+    pts = ctrl
+    while len(pts) > 1:
+        pts = (1 - t) * pts[:-1] + t * pts[1:]
+    return pts[0]
+
+
+def derivative_points(ctrl, order):
+    n = len(ctrl) - 1
+    for r in range(order):
+        ctrl = (n - r) * (ctrl[1:] - ctrl[:-1])
+    return ctrl
+
+
+@pytest.mark.parametrize("degree", DEGREES)
+def test_points_match_de_casteljau(degree):
+    ctrl = control_points(degree)
+    expected = np.array([de_casteljau(ctrl, t) for t in TS])
+    scale = np.abs(ctrl).max()
+    np.testing.assert_allclose([horner_point(ctrl, t) for t in TS], expected, rtol=0, atol=RTOL * scale)
+    np.testing.assert_allclose(evaluate(ctrl, TS), expected, rtol=0, atol=RTOL * scale)
+
+
+@pytest.mark.parametrize("degree,order", [(d, o) for d in DEGREES for o in (1, 2) if d >= o])
+def test_derivatives_match_de_casteljau(degree, order):
+    ctrl = control_points(degree)
+    d = derivative_points(ctrl, order)
+    expected = np.array([de_casteljau(d, t) for t in TS])
+    scale = np.abs(d).max()
+    np.testing.assert_allclose([horner_derivative(ctrl, t, order) for t in TS], expected, rtol=0, atol=RTOL * scale)
+    if order == 1:
+        np.testing.assert_allclose(evaluate_derivative(ctrl, TS), expected, rtol=0, atol=RTOL * scale)
@@ -0,0 +1,86 @@
+"""Every precision mode stays within the error bound it reports, against exact rational arithmetic."""
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+import precision
+from arclength import ArcLengthTable
+from trajectory import sample_chunks
+
+DEGREES = (3, 10, 30, 50)
+TS = (0.0, 1e-9, 1e-3, 0.1, 1 / 3, 0.5, 0.7, 1 - 1e-3, 1.0)
+LENGTH_TOL = 1e-4
+
+
+def control_points(degree, seed=7):
+    return np.random.default_rng(seed + degree).uniform((0, 0), (800, 500), size=(degree + 1, 2))
+
+
+def exact_derivative(ctrl, t, order):
+    """order-th derivative at t by differences and de Casteljau in Fractions."""
+    pts = [(Fraction(x), Fraction(y)) for x, y in ctrl.tolist()]
+    n = len(pts) - 1
+    for r in range(order):
+        pts = [((b[0] - a[0]) * (n - r), (b[1] - a[1]) * (n - r)) for a, b in zip(pts, pts[1:])]
+    t = Fraction(t)
+    while len(pts) > 1:
+        pts = [((1 - t) * a[0] + t * b[0], (1 - t) * a[1] + t * b[1]) for a, b in zip(pts, pts[1:])]
+    return np.array([float(pts[0][0]), float(pts[0][1])])
+
+
+@pytest.mark.parametrize("mode", precision.MODES)
+@pytest.mark.parametrize("degree", DEGREES)
+@pytest.mark.parametrize("order", (0, 1, 2))
+def test_evaluate_bounded_within_bound(mode, degree, order):
+    ctrl = control_points(degree)
+    values, bounds = precision.evaluate_bounded(ctrl, TS, order, mode)
+    exact = np.array([exact_derivative(ctrl, t, order) for t in TS])
+    err = np.hypot(*(values - exact).T)
+    # The exact values are rounded once to float64 themselves
+    assert np.all(err <= bounds + precision.UNIT_ROUNDOFF * np.hypot(*exact.T))
+
+
+@pytest.mark.parametrize("mode", precision.MODES)
+@pytest.mark.parametrize("degree", DEGREES)
+def test_curvature_within_bound(mode, degree):
+    ctrl = control_points(degree)
+    k, bounds = precision.curvature(ctrl, TS, mode)
+    d1 = np.array([exact_derivative(ctrl, t, 1) for t in TS])
+    d2 = np.array([exact_derivative(ctrl, t, 2) for t in TS])
+    exact = (d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]) / np.hypot(d1[:, 0], d1[:, 1]) ** 3
+    assert np.all(np.abs(k - exact) <= bounds + 4 * precision.UNIT_ROUNDOFF * np.abs(exact))
+
+
+@pytest.mark.parametrize("mode", ("stable", "compensated"))
+@pytest.mark.parametrize("degree", DEGREES)
+def test_length_within_bound(mode, degree):
+    ctrl = control_points(degree)
+    total, bound = precision.length(ctrl, LENGTH_TOL, mode)
+    exact = ArcLengthTable.from_quadrature(ctrl, 1e-11, max_intervals=1 << 16).total
+    assert bound <= LENGTH_TOL
+    assert abs(total - exact) <= bound + 1e-9 * exact
+
+
+@pytest.mark.parametrize("degree", (3, 10))
+def test_fast_length_estimate(degree):
+    # The fast bound is a refinement estimate, not a guarantee; on moderate degrees it holds
+    ctrl = control_points(degree)
+    total, estimate = precision.length(ctrl, LENGTH_TOL, "fast")
+    exact = ArcLengthTable.from_quadrature(ctrl, 1e-11, max_intervals=1 << 16).total
+    assert abs(total - exact) <= max(estimate, LENGTH_TOL)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        precision.evaluate_bounded(control_points(3), TS, 0, "exact")
+
+
+@pytest.mark.parametrize("mode", precision.MODES)
+def test_trajectory_precision(mode):
+    ctrl = control_points(30)
+    rows = np.concatenate(list(sample_chunks([ctrl], samples=len(TS) + 2, precision=mode)))
+    exact = np.array([exact_derivative(ctrl, t, 0) for t in rows["t"]])
+    _, bounds = precision.evaluate_bounded(ctrl, rows["t"], 0, mode)
+    err = np.hypot(rows["x"] - exact[:, 0], rows["y"] - exact[:, 1])
+    assert np.all(err <= bounds + precision.UNIT_ROUNDOFF * np.hypot(*exact.T))
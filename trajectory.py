@@ -0,0 +1,220 @@
+"""Streaming samples along a path of Bezier segments, for simulators and plotters.
+
+    python trajectory.py scene.bzs --mode arc-length --step 0.5 -f csv -o path.csv
+    python trajectory.py scene.json --mode adaptive --tol 0.05 -o - | consumer
+
+sample_chunks() yields structured NumPy arrays of SAMPLE_DTYPE with exactly
+chunk rows (the last one may be shorter). Segments are consumed one at a time
+and long segments are sampled in blocks, so memory stays bounded however long
+the path is. Nothing here imports Qt.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from arclength import ArcLengthTable
+from bezier_eval import as_points, evaluate, hodograph
+from flatten import DEFAULT_TOLERANCE, flatten
+from precision import MODES as PRECISION_MODES, evaluate_bounded
+from scene_io import BinaryScene, is_binary, load_json
+
+MODES = ("uniform-t", "arc-length", "adaptive")
+FORMATS = ("raw", "csv")
+DEFAULT_CHUNK = 4096
+DEFAULT_SAMPLES = 101
+DEFAULT_STEP = 1.0
+LENGTH_TOL = 1e-6
+SPEED_EPS = 1e-9
+SAMPLE_DTYPE = np.dtype([
+    ("segment", "<u4"),
+    ("t", "<f8"),
+    ("x", "<f8"), ("y", "<f8"),
+    ("tx", "<f8"), ("ty", "<f8"),
+    ("curvature", "<f8"),
+    ("s", "<f8"),
+])
+
+
+class _Track:
+    """Hodographs and arc-length table of one segment, and the path length before it.
+
+    precision picks how points, tangents and curvature are evaluated (see
+    precision.py); fast is the Horner path of the canvas.
+    """
+    def __init__(self, index, ctrl, offset, precision="fast"):
+        self.index = index
+        self.ctrl = ctrl
+        self.d1 = hodograph(ctrl)
+        self.d2 = hodograph(self.d1) if len(self.d1) else np.zeros((0, 2))
+        self.table = ArcLengthTable.from_quadrature(ctrl, LENGTH_TOL)
+        self.offset = offset
+        self.precision = precision
+
+    @property
+    def length(self):
+        return self.table.total
+
+    def samples(self, ts, s=None):
+        """SAMPLE_DTYPE rows at ts; s is the arc length within the segment when already known."""
+        out = np.empty(len(ts), SAMPLE_DTYPE)
+        out["segment"] = self.index
+        out["t"] = ts
+        if self.precision == "fast":
+            pts = evaluate(self.ctrl, ts)
+            v = evaluate(self.d1, ts)
+            a = evaluate(self.d2, ts)
+        else:
+            pts = evaluate_bounded(self.ctrl, ts, 0, self.precision)[0]
+            v = evaluate_bounded(self.ctrl, ts, 1, self.precision)[0]
+            a = evaluate_bounded(self.ctrl, ts, 2, self.precision)[0]
+        out["x"], out["y"] = pts[:, 0], pts[:, 1]
+        speed = np.hypot(v[:, 0], v[:, 1])
+        ok = speed > SPEED_EPS
+        out["tx"] = np.divide(v[:, 0], speed, out=np.zeros_like(speed), where=ok)
+        out["ty"] = np.divide(v[:, 1], speed, out=np.zeros_like(speed), where=ok)
+        cross = v[:, 0] * a[:, 1] - v[:, 1] * a[:, 0]
+        out["curvature"] = np.divide(cross, speed ** 3, out=np.zeros_like(speed), where=ok)
+        out["s"] = self.offset + (self.table.length_at(ts) if s is None else s)
+        return out
+
+
+def _blocks(segments, mode, samples, step, tol, block, precision="fast"):
+    """SAMPLE_DTYPE arrays of at most block rows, segment by segment."""
+    offset = 0.0
+    # Arc-length mode: distance into the next segment at which the grid resumes
+    carry = 0.0
+    last = None
+    for index, ctrl in enumerate(segments):
+        ctrl = as_points(ctrl)
+        if len(ctrl) == 0:
+            continue
+        track = _Track(index, ctrl, offset, precision)
+        if mode == "uniform-t":
+            for start in range(0, samples, block):
+                k = np.arange(start, min(samples, start + block))
+                yield track.samples(k / max(1, samples - 1))
+        elif mode == "adaptive":
+            ts = flatten(ctrl, tol)[0]
+            for start in range(0, len(ts), block):
+                yield track.samples(ts[start:start + block])
+        else:
+            count = int(np.floor((track.length - carry) / step)) + 1 if carry <= track.length else 0
+            for start in range(0, count, block):
+                s = carry + step * np.arange(start, min(count, start + block))
+                yield track.samples(track.table.t_at_length(s), s)
+            carry += count * step - track.length
+        offset += track.length
+        last = track
+    # Close the path on its end point when the arc-length grid stopped short of it
+    if mode == "arc-length" and last is not None and carry < step * (1 - 1e-9):
+        yield last.samples(np.ones(1), np.full(1, last.length))
+
+
+def sample_chunks(segments, mode="uniform-t", samples=DEFAULT_SAMPLES, step=DEFAULT_STEP,
+                  tol=DEFAULT_TOLERANCE, chunk=DEFAULT_CHUNK, precision="fast"):
+    """Samples along segments (an iterable of control-point arrays) in chunks of chunk rows.
+
+    uniform-t takes samples parameters per segment, end points included;
+    arc-length spaces samples step units apart along the whole path;
+    adaptive takes the flattening parameters, so the polyline through the
+    samples stays within tol of the curve. Tangents are unit vectors (zero
+    where the speed vanishes), curvature is signed and s is the path length
+    from the start of the first segment. precision is one of the modes of
+    precision.py and applies to points, tangents and curvature; stable and
+    compensated stay accurate for high degrees at a higher cost.
+    """
+    if mode not in MODES:
+        raise ValueError(f"unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+    if precision not in PRECISION_MODES:
+        raise ValueError(f"unknown precision mode {precision!r}, expected one of {', '.join(PRECISION_MODES)}")
+    if chunk < 1 or samples < 1 or step <= 0 or tol <= 0:
+        raise ValueError("chunk and samples must be positive, step and tol greater than 0")
+    buf = np.empty(chunk, SAMPLE_DTYPE)
+    fill = 0
+    for rows in _blocks(segments, mode, samples, step, tol, chunk, precision):
+        while len(rows):
+            take = min(chunk - fill, len(rows))
+            buf[fill:fill + take] = rows[:take]
+            rows = rows[take:]
+            fill += take
+            if fill == chunk:
+                yield buf.copy()
+                fill = 0
+    if fill:
+        yield buf[:fill].copy()
+
+
+def _open_output(dest, fmt):
+    if dest is None or dest == "-":
+        return (sys.stdout.buffer if fmt == "raw" else sys.stdout), False
+    if isinstance(dest, str) or hasattr(dest, "__fspath__"):
+        return (open(dest, "wb") if fmt == "raw" else open(dest, "w", newline="")), True
+    return dest, False
+
+
+def write_chunks(chunks, dest=None, fmt="raw"):
+    """Write chunks to a path, an open file or a pipe ("-" or None for stdout); returns the row count.
+
+    raw writes the records packed as SAMPLE_DTYPE, little endian; csv writes
+    one header line and one line per sample.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    f, owned = _open_output(dest, fmt)
+    rows = 0
+    try:
+        if fmt == "csv":
+            f.write(",".join(SAMPLE_DTYPE.names) + "\n")
+        for c in chunks:
+            if fmt == "raw":
+                f.write(c.tobytes())
+            else:
+                np.savetxt(f, c, fmt=["%d"] + ["%.17g"] * (len(SAMPLE_DTYPE.names) - 1), delimiter=",")
+            rows += len(c)
+        f.flush()
+    finally:
+        if owned:
+            f.close()
+    return rows
+
+
+def open_scene(path):
+    """Segments of a scene file; binary scenes are iterated straight from the mapping."""
+    return BinaryScene(path) if is_binary(path) else load_json(path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Stream samples along the segments of scene files.")
+    parser.add_argument("scenes", nargs="+", help="scene files (.json or .bzs), sampled as one path")
+    parser.add_argument("--mode", choices=MODES, default="uniform-t")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="samples per segment (uniform-t)")
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP, help="spacing along the path (arc-length)")
+    parser.add_argument("--tol", type=float, default=DEFAULT_TOLERANCE, help="polyline tolerance (adaptive)")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="rows per chunk")
+    parser.add_argument("--precision", choices=PRECISION_MODES, default="fast", help="evaluation mode")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="raw")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    def segments():
+        for path in args.scenes:
+            yield from open_scene(path)
+
+    chunks = sample_chunks(segments(), args.mode, args.samples, args.step, args.tol, args.chunk, args.precision)
+    try:
+        rows = write_chunks(chunks, args.output, args.format)
+    except BrokenPipeError:
+        # The reading end closed early (e.g. piped into head); not an error
+        sys.stderr.close()
+        return 0
+    print(f"wrote {rows} sample(s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())